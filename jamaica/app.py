@@ -21,6 +21,7 @@ import jamaica.v1.setup.endpoints
 import jamaica.v1.constructions.endpoints
 import jamaica.v1.glassware.endpoints
 import jamaica.v1.auth.endpoints
+import jamaica.v1.typeahead.endpoints
 
 
 def configure_app(flask_app):
@@ -53,6 +54,7 @@ def initialize_endpoints(flask_app):
         jamaica.v1.constructions.endpoints.ns,
         jamaica.v1.glassware.endpoints.ns,
         jamaica.v1.auth.endpoints.ns,
+        jamaica.v1.typeahead.endpoints.ns,
     ]
     for ns in namespaces:
         api.add_namespace(ns)
@@ -0,0 +1,412 @@
+import json
+import threading
+from contextlib import contextmanager
+from elasticsearch.helpers import bulk
+from elasticsearch_dsl import Q
+from elasticsearch_dsl.connections import connections
+from flask_sqlalchemy_session import current_session
+from sqlalchemy import cast, select
+from sqlalchemy.dialects.postgresql import JSONB, array, insert
+from werkzeug.exceptions import BadRequest
+from jamaica.v1.restx import api
+
+from barbados.serializers import ObjectSerializer
+from barbados.exceptions import ValidationException
+
+
+class BufferedConnection:
+    """
+    Stand-in for the default search connection. While a batch is open on the
+    current thread, document writes are queued instead of being sent one by one.
+    Everything else (searches, index management, etc) passes straight through.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    @property
+    def actions(self):
+        return getattr(self._local, 'actions', None)
+
+    def begin(self):
+        self._local.actions = []
+
+    def end(self):
+        self._local.actions = None
+
+    def index(self, index=None, body=None, id=None, **kwargs):
+        if self.actions is None:
+            return self.connection.index(index=index, body=body, id=id, **kwargs)
+
+        self.actions.append({'_op_type': 'index', '_index': index, '_id': id, '_source': body})
+        return {'_index': index, '_id': id, 'result': 'created'}
+
+    def delete(self, index=None, id=None, **kwargs):
+        if self.actions is None:
+            return self.connection.delete(index=index, id=id, **kwargs)
+
+        self.actions.append({'_op_type': 'delete', '_index': index, '_id': id})
+        return {'_index': index, '_id': id, 'result': 'deleted'}
+
+    def flush(self):
+        """
+        Send everything that was queued as a single bulk request.
+        :return: Number of successful actions.
+        """
+        actions = self.actions
+        self.begin()
+        if not actions:
+            return 0
+
+        success, _ = bulk(self.connection, actions)
+        return success
+
+
+class BulkIndexer:
+    """
+    Batch the writes of any barbados indexer into one bulk request. The
+    indexers still build their own documents, we just hold onto them.
+    """
+
+    @staticmethod
+    def _connection():
+        """
+        Get the buffered default connection, installing it if needed.
+        :return: BufferedConnection
+        """
+        connection = connections.get_connection()
+        if not isinstance(connection, BufferedConnection):
+            connection = BufferedConnection(connection)
+            connections.add_connection('default', connection)
+
+        return connection
+
+    @classmethod
+    @contextmanager
+    def batch(cls):
+        """
+        Context manager that collects every index write made inside of it
+        and sends them all at once on exit.
+        :return: None
+        """
+        connection = cls._connection()
+        connection.begin()
+        try:
+            yield connection
+            connection.flush()
+        finally:
+            connection.end()
+
+    @classmethod
+    def index(cls, indexer, objs):
+        """
+        Index a list of objects with one request.
+        :param indexer: barbados Indexer class.
+        :param objs: List of objects that the indexer supports.
+        :return: None
+        """
+        with cls.batch():
+            for obj in objs:
+                indexer.index(obj)
+
+    @staticmethod
+    def refresh(index):
+        """
+        Make every write to an index visible to searches now rather than on
+        its next scheduled refresh. Do this before bumping the generation of
+        the data in it, or a search in between is cached as the new results.
+        :param index: barbados Index class.
+        :return: None
+        """
+        index._index.refresh()
+
+    @staticmethod
+    def _exact(index, field):
+        """
+        Find the name to match a field on exactly. Analyzed text fields are
+        matched on their keyword subfield.
+        :param index: barbados Index class.
+        :param field: Field name.
+        :return: String
+        """
+        try:
+            mapping = index._doc_type.mapping[field]
+        except KeyError:
+            return field
+
+        if mapping.name == 'text':
+            for name, subfield in (mapping._params.get('fields') or {}).items():
+                if subfield.name == 'keyword':
+                    return "%s.%s" % (field, name)
+
+        return field
+
+    @classmethod
+    def delete_by(cls, index, **fields):
+        """
+        De-index every document whose fields exactly match the given values
+        with a single delete-by-query, the same rows that BulkFactory.delete_by
+        deletes from the database.
+        :param index: barbados Index class.
+        :param fields: Field names and values to match. A list matches any of its values.
+        :return: Number of documents deleted.
+        """
+        filters = []
+        for field, value in fields.items():
+            if isinstance(value, list):
+                filters.append(Q('terms', **{cls._exact(index, field): [str(item) for item in value]}))
+            else:
+                filters.append(Q('term', **{cls._exact(index, field): str(value)}))
+
+        query = Q('bool', filter=filters)
+        response = index.search().query(query).delete()
+        return response.deleted
+
+
+class BulkFactory:
+    """
+    Set-based database operations that would otherwise be done one object
+    at a time through a barbados Factory.
+    """
+    # Postgres caps the number of bind parameters in a single statement.
+    chunk_size = 1000
+
+    @staticmethod
+    def _rows(table, objs):
+        """
+        Serialize objects into rows of a table.
+        :param table: sqlalchemy Table.
+        :param objs: List of objects.
+        :return: List of Dicts.
+        """
+        rows = []
+        for obj in objs:
+            serialized_obj = ObjectSerializer.serialize(obj, 'dict')
+            rows.append({key: value for key, value in serialized_obj.items() if key in table.columns})
+
+        return rows
+
+    @staticmethod
+    def insert_objs(factory, objs, commit=True):
+        """
+        Insert a list of objects in a single transaction, with one statement
+        per chunk_size objects. Objects that already exist are left alone
+        rather than failing the whole thing.
+        :param factory: barbados Factory class.
+        :param objs: List of objects that the factory produces.
+        :param commit: Commit the session when done.
+        :return: List of the primary keys that were inserted.
+        """
+        if not objs:
+            return []
+
+        table = factory._model.__table__
+        rows = BulkFactory._rows(table, objs)
+        primary_key = list(table.primary_key.columns)
+
+        inserted = []
+        for start in range(0, len(rows), BulkFactory.chunk_size):
+            statement = insert(table).values(rows[start:start + BulkFactory.chunk_size])
+            statement = statement.on_conflict_do_nothing().returning(*primary_key)
+            inserted += [row[0] if len(row) == 1 else tuple(row) for row in current_session.execute(statement)]
+
+        if commit:
+            current_session.commit()
+
+        return inserted
+
+    @staticmethod
+    def upsert_objs(factory, objs, commit=True):
+        """
+        Insert or overwrite a list of objects in a single transaction, with one
+        statement per chunk_size objects. This is the bulk equivalent of
+        factory.insert_obj(obj, overwrite=True).
+        :param factory: barbados Factory class.
+        :param objs: List of objects that the factory produces.
+        :param commit: Commit the session when done.
+        :return: Number of objects written.
+        """
+        if not objs:
+            return 0
+
+        table = factory._model.__table__
+        rows = BulkFactory._rows(table, objs)
+
+        for start in range(0, len(rows), BulkFactory.chunk_size):
+            statement = insert(table).values(rows[start:start + BulkFactory.chunk_size])
+            statement = statement.on_conflict_do_update(
+                index_elements=[column.name for column in table.primary_key.columns],
+                set_={column.name: statement.excluded[column.name] for column in table.columns if not column.primary_key}
+            )
+            current_session.execute(statement)
+
+        if commit:
+            current_session.commit()
+
+        return len(rows)
+
+    @staticmethod
+    def delete_by(factory, commit=True, **fields):
+        """
+        Delete every row whose fields match the given values with a single
+        statement, without loading any of them.
+        :param factory: barbados Factory class.
+        :param commit: Commit the session when done.
+        :param fields: Column names and values to match. A list matches any of its values.
+        :return: Number of rows deleted.
+        """
+        query = current_session.query(factory._model)
+        for field, value in fields.items():
+            column = getattr(factory._model, field)
+            if isinstance(value, list):
+                query = query.filter(column.in_([str(item) for item in value]))
+            else:
+                query = query.filter(column == str(value))
+
+        count = query.delete(synchronize_session=False)
+
+        if commit:
+            current_session.commit()
+
+        return count
+
+    @staticmethod
+    def ids_with_keys(factory, field, keys):
+        """
+        Find every row whose JSON field has any of the given keys at its top
+        level with a single query, without loading any of them.
+        :param factory: barbados Factory class.
+        :param field: Column name of a JSON object.
+        :param keys: Iterable of keys.
+        :return: List of the primary keys of the rows.
+        """
+        keys = list(keys)
+        if not keys:
+            return []
+
+        table = factory._model.__table__
+        column = cast(table.columns[field], JSONB)
+        statement = select(list(table.primary_key.columns)).where(column.has_any(array(keys)))
+        return [row[0] if len(row) == 1 else tuple(row) for row in current_session.execute(statement)]
+
+    @staticmethod
+    def delete_all(factory, commit=True):
+        """
+        Delete every row of a factory's table with a single statement, without
+        loading any of them. Rows that depend on these are left to the
+        database's foreign keys.
+        :param factory: barbados Factory class.
+        :param commit: Commit the session when done.
+        :return: Number of rows deleted.
+        """
+        count = current_session.execute(factory._model.__table__.delete()).rowcount
+
+        if commit:
+            current_session.commit()
+
+        return count
+
+
+class BulkImporter:
+    """
+    Import many serialized objects at once. Everything is validated up front,
+    then written in one transaction and indexed in one request. Problems are
+    reported per object so that one bad apple doesn't spoil the bunch, unless
+    the caller wants it to.
+    """
+
+    @staticmethod
+    def parse(request):
+        """
+        Get the serialized objects out of a request body, which is either a
+        JSON array or newline-delimited JSON (Content-Type: application/x-ndjson).
+        :param request: flask Request.
+        :return: Tuple of (List of (index, Dict) tuples, List of error Dicts)
+        :raises ValidationException: the body is not a list of anything.
+        """
+        if request.mimetype != 'application/x-ndjson':
+            raws = request.get_json(force=True, silent=True)
+            if not isinstance(raws, list):
+                raise ValidationException("Body must be a JSON array or newline-delimited JSON.")
+            return list(enumerate(raws)), []
+
+        raws = []
+        errors = []
+        lines = [line for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        for index, line in enumerate(lines):
+            try:
+                raws.append((index, json.loads(line)))
+            except ValueError as e:
+                errors.append({'index': index, 'message': "Invalid JSON: %s" % e})
+
+        return raws, errors
+
+    @staticmethod
+    def validate(model, factory, raws):
+        """
+        Check every serialized object against the API model and turn the good
+        ones into objects.
+        :param model: flask_restx Model to validate against.
+        :param factory: barbados Factory class.
+        :param raws: List of (index, Dict) tuples from parse().
+        :return: Tuple of (List of (index, object) tuples, List of error Dicts)
+        """
+        objs = []
+        errors = []
+        seen = set()
+        for index, raw in raws:
+            slug = raw.get('slug') if isinstance(raw, dict) else None
+            try:
+                model.validate(raw, api.refresolver, api.format_checker)
+                obj = factory.raw_to_obj(raw)
+            except BadRequest as e:
+                errors.append({'index': index, 'slug': slug, 'message': 'Input payload validation failed',
+                               'errors': getattr(e, 'data', {}).get('errors')})
+                continue
+            except (ValidationException, KeyError, ValueError, TypeError) as e:
+                errors.append({'index': index, 'slug': slug, 'message': str(e)})
+                continue
+
+            if obj.slug in seen:
+                errors.append({'index': index, 'slug': obj.slug, 'message': 'Duplicate of an earlier object in this request.'})
+                continue
+
+            seen.add(obj.slug)
+            objs.append((index, obj))
+
+        return objs, errors
+
+    @staticmethod
+    def save(factory, indexer, objs, overwrite=False, atomic=False):
+        """
+        Write objects to the database in one transaction and then index them
+        with one request.
+        :param factory: barbados Factory class.
+        :param indexer: barbados Indexer class.
+        :param objs: List of (index, object) tuples from validate().
+        :param overwrite: Replace objects that already exist.
+        :param atomic: Write nothing if any object already exists.
+        :return: Tuple of (List of objects saved, List of error Dicts)
+        """
+        if overwrite:
+            BulkFactory.upsert_objs(factory, [obj for index, obj in objs], commit=False)
+            saved = objs
+            errors = []
+        else:
+            inserted = set(BulkFactory.insert_objs(factory, [obj for index, obj in objs], commit=False))
+            saved = [(index, obj) for index, obj in objs if obj.slug in inserted]
+            errors = [{'index': index, 'slug': obj.slug, 'message': 'Already exists.'}
+                      for index, obj in objs if obj.slug not in inserted]
+
+        if atomic and errors:
+            current_session.rollback()
+            return [], errors
+
+        current_session.commit()
+        BulkIndexer.index(indexer, [obj for index, obj in saved])
+
+        return [obj for index, obj in saved], errors
@@ -0,0 +1,44 @@
+import hashlib
+from functools import wraps
+from flask import request, Response
+from flask_restx.utils import unpack
+
+
+def generation_etag(*generations, id_arg=None):
+    """
+    Decorator giving a GET endpoint a strong ETag made of the URL, the
+    accepted encodings, and the current value of the generations describing
+    its data. A request whose If-None-Match already has that tag gets a 304
+    before the endpoint runs, so nothing is loaded or marshalled for it.
+    Put this above any marshalling decorator.
+    :param generations: Generation classes describing the data behind the endpoint.
+    :param id_arg: Name of the view argument holding the object ID, for per-object generations.
+    :return: Decorator
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # Stamped up front, as in VersionedCacheBase.retrieve().
+            id = kwargs.get(id_arg) if id_arg else None
+            stamp = [request.full_path, str(request.accept_encodings)]
+            stamp += [generation.current(id) for generation in generations]
+            etag = hashlib.sha1(repr(stamp).encode('utf-8')).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            rv = func(*args, **kwargs)
+            if isinstance(rv, Response):
+                rv.set_etag(etag)
+                return rv
+
+            data, code, headers = unpack(rv)
+            if code == 200:
+                headers = dict(headers or {})
+                headers['ETag'] = '"%s"' % etag
+            return data, code, headers
+
+        return wrapper
+    return decorator
@@ -0,0 +1,142 @@
+import time
+from jamaica.cache import flask_cache
+
+from barbados.caches.tablescan import CocktailScanCache, IngredientScanCache, ListScanCache, InventoryScanCache, \
+    GlasswareScanCache, ConstructionScanCache
+from barbados.caches.ingredienttree import IngredientTreeCache
+from barbados.caches.recipebibliography import RecipeBibliographyCache
+from barbados.caches.notebook import NotebookCache
+from barbados.indexers.recipe import RecipeIndexer
+from barbados.indexers.ingredient import IngredientIndexer
+from barbados.indexers.inventory import InventoryIndexer
+from barbados.indexers.list import ListIndexer
+
+
+class GenerationBase:
+    """
+    A generation is a counter in the shared cache that only ever moves forward.
+    Anything derived from the data that it describes can be keyed on the
+    current value and will stop being used the moment a write bumps it.
+    """
+    generation_key = None
+    # Caches and indexers holding data that this generation describes.
+    caches = []
+    indexers = []
+
+    @classmethod
+    def _epoch_key(cls):
+        return "generation:%s:epoch" % cls.generation_key
+
+    @classmethod
+    def _key(cls, id=None):
+        if id is None:
+            return "generation:%s" % cls.generation_key
+        # Per-object counters live under the epoch, so that moving it moves all of them.
+        return "generation:%s:%s:%s" % (cls.generation_key, cls.epoch(), id)
+
+    @staticmethod
+    def _counter(key):
+        value = flask_cache.get(key)
+        if value is None:
+            # Seed from the clock so that a counter that got evicted never
+            # rewinds onto a value that older entries were keyed on.
+            flask_cache.add(key, int(time.time() * 1000000), timeout=0)
+            value = flask_cache.get(key)
+
+        return value
+
+    @classmethod
+    def epoch(cls):
+        """
+        Get the current epoch of the per-object generations.
+        :return: Int
+        """
+        return cls._counter(cls._epoch_key())
+
+    @classmethod
+    def current(cls, id=None):
+        """
+        Get the current value of this generation.
+        :param id: Optional object ID for per-object generations.
+        :return: Int
+        """
+        return cls._counter(cls._key(id))
+
+    @classmethod
+    def bump(cls, id=None):
+        """
+        Move this generation forward. Call this after every write.
+        :param id: Optional object ID for per-object generations.
+        :return: Int of the new value.
+        """
+        key = cls._key(id)
+        cls._counter(key)
+        return flask_cache.inc(key)
+
+    @classmethod
+    def bump_all(cls):
+        """
+        Move this generation and that of every object forward at once. Call
+        this after a write to the whole collection.
+        :return: Int of the new value.
+        """
+        cls.epoch()
+        flask_cache.inc(cls._epoch_key())
+        return cls.bump()
+
+    @staticmethod
+    def for_cache(cache):
+        """
+        Find the generations describing the data held in a cache.
+        :param cache: barbados Cache class.
+        :return: List of Generation classes.
+        """
+        return [generation for generation in GenerationBase.__subclasses__()
+                if cache.cache_key in [generation_cache.cache_key for generation_cache in generation.caches]]
+
+    @staticmethod
+    def for_indexer(indexer):
+        """
+        Find the generations describing the data written by an indexer.
+        :param indexer: barbados Indexer class.
+        :return: List of Generation classes.
+        """
+        return [generation for generation in GenerationBase.__subclasses__() if indexer in generation.indexers]
+
+
+class CocktailGeneration(GenerationBase):
+    generation_key = 'cocktails'
+    caches = [CocktailScanCache, RecipeBibliographyCache, NotebookCache]
+    indexers = [RecipeIndexer]
+
+
+class IngredientGeneration(GenerationBase):
+    generation_key = 'ingredients'
+    caches = [IngredientScanCache, IngredientTreeCache]
+    indexers = [IngredientIndexer]
+
+
+class InventoryGeneration(GenerationBase):
+    """
+    Use the inventory ID for a single inventory, or nothing for all of them.
+    """
+    generation_key = 'inventories'
+    caches = [InventoryScanCache]
+    indexers = [InventoryIndexer]
+
+
+class ListGeneration(GenerationBase):
+    generation_key = 'lists'
+    caches = [ListScanCache]
+    indexers = [ListIndexer]
+
+
+class GlasswareGeneration(GenerationBase):
+    generation_key = 'glassware'
+    caches = [GlasswareScanCache]
+
+
+class ConstructionGeneration(GenerationBase):
+    generation_key = 'constructions'
+    caches = [ConstructionScanCache]
+
@@ -0,0 +1,175 @@
+import json
+import bisect
+import hashlib
+import threading
+from collections import namedtuple
+from urllib.parse import urlencode
+from flask import Response, request
+from flask_restx import marshal
+from jamaica.cache.generation import CocktailGeneration
+
+from barbados.caches.tablescan import CocktailScanCache
+from barbados.factories.cocktail import CocktailFactory
+
+# Caches can be built from other caches, so this needs to be re-entrant.
+_lock = threading.RLock()
+_entries = {}
+
+
+def digest(raw):
+    """
+    Content version of a serialized object.
+    :param raw: Dict
+    :return: String
+    """
+    return hashlib.sha1(json.dumps(raw, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class LocalCacheBase:
+    """
+    A per-process cache of something that is expensive to derive from shared
+    data. It is rebuilt whenever one of the generations it depends on moves,
+    so every worker converges without needing to be told.
+    """
+    generations = []
+
+    @classmethod
+    def refresh(cls, previous):
+        """
+        Rebuild after a generation moved with populate(), which every cache
+        defines. Override this to reuse the parts of the previous value that
+        are still good.
+        :param previous: The previous value, or None.
+        :return: The new value.
+        """
+        return cls.populate()
+
+    @classmethod
+    def stamp(cls):
+        return tuple(generation.current() for generation in cls.generations)
+
+    @classmethod
+    def retrieve(cls):
+        stamp = cls.stamp()
+        entry = _entries.get(cls)
+        if entry and entry[0] == stamp:
+            return entry[1]
+
+        with _lock:
+            entry = _entries.get(cls)
+            if entry and entry[0] == stamp:
+                return entry[1]
+
+            value = cls.refresh(entry[1] if entry else None)
+            _entries[cls] = (stamp, value)
+            return value
+
+
+CorpusEntry = namedtuple('CorpusEntry', ['slug', 'raw', 'obj', 'digest', 'components'])
+
+
+class CocktailCorpusCache(LocalCacheBase):
+    """
+    Every cocktail in the scan cache, hydrated into an object and stamped
+    with a content version.
+    """
+    generations = [CocktailGeneration]
+
+    @classmethod
+    def populate(cls):
+        corpus = []
+        for raw_c in CocktailScanCache.retrieve():
+            components = {component.get('slug') for spec in raw_c.get('specs', []) for component in spec.get('components', [])}
+            corpus.append(CorpusEntry(slug=raw_c.get('slug'), raw=raw_c, obj=CocktailFactory.raw_to_obj(raw_c),
+                                      digest=digest(raw_c), components=components))
+
+        return corpus
+
+
+def field_tree(fields):
+    """
+    Turn a list of dotted field names into a nested dict of the fields to
+    keep at each level.
+    :param fields: List of field names, e.g. ['slug', 'specs.components.slug'].
+    :return: Dict
+    """
+    tree = {}
+    for field in fields:
+        node = tree
+        for part in field.split('.'):
+            node = node.setdefault(part, {})
+
+    return tree
+
+
+def project(value, tree):
+    """
+    Keep only the selected fields of a marshalled object. Lists are projected
+    item by item and a field selected with nothing below it is kept whole.
+    :param value: Marshalled object, list of them, or scalar.
+    :param tree: Dict from field_tree().
+    :return: Projected value.
+    """
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: project(value[key], subtree) for key, subtree in tree.items() if key in value}
+
+    return value
+
+
+class CollectionCacheBase(LocalCacheBase):
+    """
+    An entire collection marshalled once and sorted by slug, so that pages
+    and projections are cut from it without going back to the model.
+    """
+    cache = None
+    model = None
+
+    @classmethod
+    def populate(cls):
+        items = sorted(marshal(cls.cache.retrieve(), cls.model), key=lambda item: item.get('slug'))
+        return [item.get('slug') for item in items], items
+
+    @classmethod
+    def page(cls, after=None, limit=None, fields=None):
+        """
+        Get a page of the collection.
+        :param after: Slug to start after.
+        :param limit: Maximum number of objects to return.
+        :param fields: List of (possibly dotted) field names to include.
+        :return: Tuple of (List of Dicts, slug to get the next page after or None if this is the last page)
+        """
+        slugs, items = cls.retrieve()
+
+        start = bisect.bisect_right(slugs, after) if after else 0
+        end = start + limit if limit else len(items)
+        page = items[start:end]
+        cursor = page[-1].get('slug') if page and end < len(items) else None
+
+        if fields:
+            page = project(page, field_tree(fields))
+
+        return page, cursor
+
+    @classmethod
+    def response(cls, after=None, limit=None, fields=None):
+        """
+        Make an HTTP response for a page of the collection. If there is more,
+        the Link header points at the next page.
+        :param after: Slug to start after.
+        :param limit: Maximum number of objects to return.
+        :param fields: List of (possibly dotted) field names to include.
+        :return: flask.Response
+        """
+        page, cursor = cls.page(after=after, limit=limit, fields=fields)
+
+        response = Response(json.dumps(page), mimetype='application/json')
+        if cursor:
+            args = request.args.to_dict()
+            args['after'] = cursor
+            response.headers['Link'] = '<%s?%s>; rel="next"' % (request.base_url, urlencode(args))
+
+        return response
@@ -0,0 +1,118 @@
+import json
+import threading
+from collections import OrderedDict
+from flask import Response
+from flask_restx import marshal
+from jamaica.cache.versioned import VersionedCacheBase
+from jamaica.settings import object_cache_settings
+
+from barbados.serializers import ObjectSerializer
+
+
+class ObjectCache(VersionedCacheBase):
+    """
+    A per-process LRU of single objects, marshalled and serialized to JSON
+    bytes and keyed by slug. Each entry is stamped with the per-object
+    generation of its slug, so a write to one object costs nothing to the
+    others and moving the epoch of the generation drops all of them. Every
+    subclass is held under its own byte budget and the least recently used
+    objects go first.
+    """
+    # barbados Factory class to produce objects with.
+    factory = None
+    # flask_restx model to marshal each object with.
+    model = None
+    # Every object cache, so that they can be reported on together.
+    instances = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.lock = threading.Lock()
+        # Slug to (key, payload), least recently used first.
+        cls.entries = OrderedDict()
+        cls.size = 0
+        cls.hits = 0
+        cls.misses = 0
+        cls.evictions = 0
+        ObjectCache.instances.append(cls)
+
+    @classmethod
+    def populate(cls, id=None):
+        """
+        Load and serialize an object.
+        :param id: Object slug.
+        :return: Bytes
+        :raises KeyError: not found.
+        """
+        obj = cls.factory.produce_obj(id=id)
+        return json.dumps(marshal(ObjectSerializer.serialize(obj, 'dict'), cls.model)).encode('utf-8')
+
+    @classmethod
+    def get(cls, key, id=None):
+        with cls.lock:
+            entry = cls.entries.get(id)
+            if entry and entry[0] == key:
+                cls.entries.move_to_end(id)
+                cls.hits += 1
+                return entry[1]
+            cls.misses += 1
+
+    @classmethod
+    def set(cls, key, value, id=None):
+        max_bytes = object_cache_settings.get('max_bytes')
+        with cls.lock:
+            cls._discard(id)
+            if len(value) > max_bytes:
+                return
+
+            cls.entries[id] = (key, value)
+            cls.size += len(value)
+            while cls.size > max_bytes:
+                cls._discard(next(iter(cls.entries)))
+                cls.evictions += 1
+
+    @classmethod
+    def _discard(cls, id):
+        entry = cls.entries.pop(id, None)
+        if entry:
+            cls.size -= len(entry[1])
+
+    @classmethod
+    def invalidate(cls, id):
+        """
+        Forget an object after a write to it. This process drops it right
+        away and the others notice the bump of its generation.
+        :param id: Object slug.
+        :return: None
+        """
+        for generation in cls.object_generations:
+            generation.bump(id)
+        with cls.lock:
+            cls._discard(id)
+
+    @classmethod
+    def response(cls, id):
+        """
+        Make an HTTP response straight from the cached bytes.
+        :param id: Object slug.
+        :return: flask.Response
+        """
+        return Response(cls.retrieve(id), mimetype='application/json')
+
+    @classmethod
+    def stats(cls):
+        """
+        How well this cache is doing in this process.
+        :return: Dict
+        """
+        with cls.lock:
+            return {
+                'name': cls.cache_key,
+                'entries': len(cls.entries),
+                'bytes': cls.size,
+                'max_bytes': object_cache_settings.get('max_bytes'),
+                'hits': cls.hits,
+                'misses': cls.misses,
+                'evictions': cls.evictions,
+                'hit_rate': cls.hits / (cls.hits + cls.misses) if cls.hits + cls.misses else None,
+            }
@@ -0,0 +1,62 @@
+import json
+import gzip
+import brotli
+from flask import Response, request
+from flask_restx import marshal
+from jamaica.cache.versioned import VersionedCacheBase
+
+
+class PayloadCache(VersionedCacheBase):
+    """
+    The marshalled JSON bytes of a cache, stored next to it in the shared
+    cache along with their gzip and brotli compressions. They are keyed on
+    the generations of the data, so they are rebuilt once after the cache is
+    invalidated rather than on every request.
+    """
+    # barbados Cache class.
+    cache = None
+    # flask_restx model to marshal each item with, if any.
+    model = None
+    encodings = {
+        'br': lambda payload: brotli.compress(payload, quality=11),
+        'gzip': lambda payload: gzip.compress(payload, compresslevel=9),
+    }
+
+    @classmethod
+    def data(cls):
+        """
+        Get what should be in the payload.
+        :return: List or Dict
+        """
+        return cls.cache.retrieve()
+
+    @classmethod
+    def populate(cls, id=None):
+        """
+        Serialize the data and compress it every way we know how.
+        :return: Dict of encoding to bytes.
+        """
+        data = cls.data()
+        if cls.model:
+            data = marshal(data, cls.model)
+
+        payload = json.dumps(data).encode('utf-8')
+        payloads = {encoding: compress(payload) for encoding, compress in cls.encodings.items()}
+        payloads['identity'] = payload
+
+        return payloads
+
+    @classmethod
+    def response(cls):
+        """
+        Make an HTTP response straight from the cached bytes, in the best
+        encoding that the client accepts.
+        :return: flask.Response
+        """
+        encoding = request.accept_encodings.best_match(list(cls.encodings.keys()), default='identity')
+        response = Response(cls.retrieve()[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+
+        return response
@@ -0,0 +1,88 @@
+import json
+import hashlib
+from flask_restx import marshal
+from jamaica.cache import flask_cache
+from jamaica.settings import search_cache_settings
+
+
+class SearchCache:
+    """
+    Marshalled results of a search, keyed on its normalized arguments and the
+    generation of the data in the index. Any write to the index bumps the
+    generation, so stale results are simply never looked up again and expire
+    on their own.
+    """
+    stats_key = 'search:stats:%s:%s'
+    # Every search cache, so that they can be reported on together.
+    instances = []
+
+    def __init__(self, name, search, model, generation):
+        """
+        :param name: Short name of this search for keys and stats.
+        :param search: barbados Search class.
+        :param model: flask_restx model to marshal each result with.
+        :param generation: Generation class describing the data in the index.
+        """
+        self.name = name
+        self.search = search
+        self.model = model
+        self.generation = generation
+        SearchCache.instances.append(self)
+
+    @staticmethod
+    def normalize(args):
+        """
+        Make equivalent search arguments look the same.
+        :param args: Dict of parsed arguments.
+        :return: Dict
+        """
+        normalized = {}
+        for key, value in args.items():
+            if isinstance(value, str):
+                value = value.strip()
+            if isinstance(value, list):
+                value = sorted({item.strip() for item in value if item and item.strip()})
+            if value is None or value == '' or value == []:
+                continue
+            normalized[key] = value
+
+        return normalized
+
+    def key(self, args):
+        digest = hashlib.sha1(json.dumps(self.normalize(args), sort_keys=True).encode('utf-8')).hexdigest()
+        return "search:%s:%s:%s" % (self.name, self.generation.current(), digest)
+
+    def execute(self, **args):
+        """
+        Run the search unless we already know the answer.
+        :param args: Parsed arguments of the search.
+        :return: List of marshalled results.
+        """
+        key = self.key(args)
+        results = flask_cache.get(key)
+        if results is not None:
+            self._count('hits')
+            return results
+
+        self._count('misses')
+        results = marshal(self.search(**args).execute(), self.model)
+        flask_cache.set(key, results, timeout=search_cache_settings.get('timeout'))
+
+        return results
+
+    def _count(self, outcome):
+        flask_cache.inc(self.stats_key % (self.name, outcome))
+
+    def stats(self):
+        """
+        How well this cache is doing.
+        :return: Dict
+        """
+        hits = flask_cache.get(self.stats_key % (self.name, 'hits')) or 0
+        misses = flask_cache.get(self.stats_key % (self.name, 'misses')) or 0
+        return {
+            'name': self.name,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else None,
+        }
@@ -0,0 +1,74 @@
+from jamaica.cache import flask_cache
+from jamaica.cache.generation import CocktailGeneration, IngredientGeneration, InventoryGeneration
+from jamaica.resolvers import resolve_inventory_recipes
+
+from barbados.factories.inventory import InventoryFactory
+from barbados.serializers import ObjectSerializer
+
+
+class VersionedCacheBase:
+    """
+    A shared cache of results keyed on the generations they were derived from.
+    Writes bump a generation which changes the key, so nothing ever needs to be
+    deleted and a stale entry can never be served. Old entries simply age out.
+    Every cache defines populate(id) to produce a result. Override get() and
+    set() to keep the results somewhere else.
+    """
+    cache_key = None
+    # Generations of the object itself, called with its ID.
+    object_generations = []
+    # Generations of everything else the result depends on.
+    generations = []
+
+    @classmethod
+    def key(cls, id=None):
+        versions = [generation.current(id) for generation in cls.object_generations]
+        versions += [generation.current() for generation in cls.generations]
+        parts = [cls.cache_key] if id is None else [cls.cache_key, str(id)]
+        return ':'.join(parts + [str(version) for version in versions])
+
+    @classmethod
+    def get(cls, key, id=None):
+        return flask_cache.get(key)
+
+    @classmethod
+    def set(cls, key, value, id=None):
+        flask_cache.set(key, value)
+
+    @classmethod
+    def retrieve(cls, id=None):
+        # Work out the key before populating. If something is written while we
+        # are busy, the result lands under the old versions and is never read.
+        key = cls.key(id)
+        value = cls.get(key, id=id)
+        if value is None:
+            value = cls.populate(id)
+            cls.set(key, value, id=id)
+
+        return value
+
+
+class InventoryRecipesCache(VersionedCacheBase):
+    """
+    Serialized recipe resolutions of an inventory against the entire corpus.
+    """
+    cache_key = 'inventory:recipes'
+    object_generations = [InventoryGeneration]
+    generations = [CocktailGeneration, IngredientGeneration]
+
+    @classmethod
+    def populate(cls, id):
+        return resolve_inventory_recipes(id=id)
+
+
+class InventoryFullCache(VersionedCacheBase):
+    """
+    Serialized inventory expanded against the ingredient tree, implicit items and all.
+    """
+    cache_key = 'inventory:full'
+    object_generations = [InventoryGeneration]
+    generations = [IngredientGeneration]
+
+    @classmethod
+    def populate(cls, id):
+        return ObjectSerializer.serialize(InventoryFactory.produce_obj(id=id, expand=True), 'dict')
@@ -0,0 +1,140 @@
+import uuid
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from jamaica.cache import flask_cache
+from jamaica.settings import job_settings
+
+from barbados.services.logging import LogService
+
+
+class JobStatus:
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+
+class Job:
+    """
+    A unit of work running in the background. The function doing the work
+    is handed the Job so that it can report progress as it goes. The state
+    of the job is kept in the shared cache, so any process can report on it.
+    """
+    job_key = 'job:%s'
+    # Everything about a job that is kept in the shared cache.
+    fields = ['id', 'description', 'status', 'completed', 'total', 'result', 'error', 'created_at', 'started_at',
+              'finished_at']
+
+    def __init__(self, description=None, timeout=None):
+        """
+        :param description: String describing the job.
+        :param timeout: Seconds to keep the state of the job for after it last changed.
+        """
+        self.id = str(uuid.uuid4())
+        self.description = description
+        self.timeout = timeout
+        self.status = JobStatus.PENDING
+        self.completed = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in [JobStatus.SUCCEEDED, JobStatus.FAILED]
+
+    def save(self):
+        """
+        Share the state of this job. Call this after every change to it.
+        :return: None
+        """
+        flask_cache.set(self.job_key % self.id, {field: getattr(self, field) for field in self.fields},
+                        timeout=self.timeout)
+
+    @classmethod
+    def retrieve(cls, id):
+        """
+        Get the state of a job from whichever process is running it.
+        :param id: ID of the job.
+        :return: Job
+        :raises KeyError: not found
+        """
+        raw = flask_cache.get(cls.job_key % id)
+        if raw is None:
+            raise KeyError("Job %s not found." % id)
+
+        job = cls()
+        for field, value in raw.items():
+            setattr(job, field, value)
+        return job
+
+    def progress(self, completed, total):
+        """
+        Report how far along this job is.
+        :param completed: Int of units of work done.
+        :param total: Int of units of work overall.
+        :return: None
+        """
+        self.completed = completed
+        self.total = total
+        self.save()
+
+
+class LocalJobBackend:
+    """
+    Run jobs on a thread pool inside of this process. Their state is shared,
+    so a job can be polled from any process until it expires.
+    """
+
+    def __init__(self, workers, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jamaica-job')
+
+    def submit(self, func, description=None, **kwargs):
+        """
+        Start running a function as a job.
+        :param func: Function to run. It is called as func(job=job, **kwargs).
+        :param description: String describing the job.
+        :param kwargs: Arguments to the function.
+        :return: Job
+        """
+        job = Job(description=description, timeout=self.timeout)
+        job.save()
+
+        # The job needs its own app context to get a database session.
+        app = current_app._get_current_object()
+        self._executor.submit(self._run, app, job, func, kwargs)
+        return job
+
+    @staticmethod
+    def get(id):
+        """
+        Get a job.
+        :param id: ID of the job.
+        :return: Job
+        :raises KeyError: not found
+        """
+        return Job.retrieve(str(id))
+
+    @staticmethod
+    def _run(app, job, func, kwargs):
+        with app.app_context():
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.utcnow().isoformat()
+            job.save()
+            try:
+                job.result = func(job=job, **kwargs)
+                job.status = JobStatus.SUCCEEDED
+            except Exception as e:
+                LogService.error("Job %s failed: %s" % (job.id, e))
+                job.error = str(e)
+                job.status = JobStatus.FAILED
+            job.finished_at = datetime.utcnow().isoformat()
+            job.save()
+
+
+job_runner = LocalJobBackend(**job_settings)
@@ -0,0 +1,425 @@
+import time
+from jamaica.cache import flask_cache
+from jamaica.cache.local import CocktailCorpusCache
+from jamaica.cache.generation import IngredientGeneration, InventoryGeneration
+from jamaica.bulk import BulkFactory, BulkIndexer
+
+from barbados.caches.ingredienttree import IngredientTreeCache
+from barbados.factories.reciperesolution import RecipeResolutionFactory
+from barbados.resolvers.recipe import RecipeResolver
+from barbados.factories.inventory import InventoryFactory
+from barbados.indexers.reciperesolution import RecipeResolutionIndexer
+from barbados.indexes.reciperesolution import RecipeResolutionIndex
+from barbados.indexers.inventory import InventoryIndexer
+from barbados.serializers import ObjectSerializer
+
+
+class BatchRecipeResolver:
+    """
+    Resolve an inventory against the entire cocktail corpus in one pass.
+    The corpus is hydrated straight from the CocktailScanCache payload
+    rather than going back to the database once per cocktail.
+    """
+
+    @staticmethod
+    def corpus():
+        """
+        Hydrate every cocktail in the scan cache into an object.
+        :return: List[Cocktail]
+        """
+        return [entry.obj for entry in CocktailCorpusCache.retrieve()]
+
+    @classmethod
+    def iter_resolve(cls, inventory, cocktails=None):
+        """
+        Resolve an inventory against a corpus one cocktail at a time.
+        :param inventory: Inventory object.
+        :param cocktails: List of Cocktail objects. Defaults to the entire corpus.
+        :return: Generator of (Cocktail, List[RecipeResolutionSummary]) tuples.
+        """
+        if cocktails is None:
+            cocktails = cls.corpus()
+
+        for c in cocktails:
+            yield c, RecipeResolver.resolve(inventory=inventory, cocktail=c)
+
+    @classmethod
+    def resolve(cls, inventory, cocktails=None):
+        """
+        Resolve an inventory against every spec of every cocktail in a corpus.
+        This produces the same output as calling RecipeResolver.resolve() for
+        each cocktail individually.
+        :param inventory: Inventory object.
+        :param cocktails: List of Cocktail objects. Defaults to the entire corpus.
+        :return: List[RecipeResolutionSummary]
+        """
+        results = []
+        for c, c_results in cls.iter_resolve(inventory=inventory, cocktails=cocktails):
+            results += c_results
+
+        return results
+
+
+class InventoryItemResolver:
+    """
+    Answer whether a single ingredient is in an inventory, explicitly or
+    implicitly, by walking only that ingredient's part of the tree instead
+    of expanding the whole inventory.
+    """
+
+    @classmethod
+    def _implies(cls, tree, slug):
+        """
+        Find the ancestors that having an ingredient implies having, which
+        stop at its implies_root.
+        :param tree: IngredientTree
+        :param slug: Ingredient slug.
+        :return: Set of ingredient slugs.
+        """
+        substitution = tree.substitutions(slug)
+        parents = set(substitution.get('parents') or [])
+
+        scope = cls.scope(tree, slug, substitution)
+        return parents if scope is None else parents & scope
+
+    @staticmethod
+    def scope(tree, slug, substitution=None):
+        """
+        Find what an ingredient can stand in for or be stood in for by
+        without crossing its implies_root.
+        :param tree: IngredientTree
+        :param slug: Ingredient slug.
+        :param substitution: The ingredient's tree.substitutions(), if already looked up.
+        :return: Set of ingredient slugs, or None if there is no implies_root.
+        """
+        substitution = substitution or tree.substitutions(slug)
+        implies_root = substitution.get('implies_root')
+        if not implies_root:
+            return None
+        if implies_root == slug:
+            return set()
+
+        return {implies_root} | set(tree.substitutions(implies_root).get('children') or [])
+
+    @classmethod
+    def resolve(cls, inventory, slug):
+        """
+        Look up a single ingredient in an inventory.
+        :param inventory: Inventory object. It does not need to be expanded.
+        :param slug: Ingredient slug.
+        :return: Dict shaped like an InventoryItem, or None if it's not in the inventory.
+        :raises KeyError: ingredient not in the tree
+        """
+        tree = IngredientTreeCache.retrieve()
+        items = set(inventory.items.keys())
+
+        # Anything below this ingredient that we have can stand in for it.
+        descendants = set(tree.substitutions(slug).get('children') or []) & items
+        providers = sorted(descendant for descendant in descendants if slug in cls._implies(tree, descendant))
+
+        item = inventory.items.get(slug)
+        if item:
+            serialized_item = ObjectSerializer.serialize(item, 'dict')
+            serialized_item['substitutes'] = sorted(set(serialized_item.get('substitutes') or []) | set(providers))
+            return serialized_item
+
+        if providers:
+            return {'slug': slug, 'substitutes': providers}
+
+
+class ResolutionManifest:
+    """
+    Record of the versions that the stored RecipeResolutions of an inventory
+    were generated from: the inventory items, the ingredient tree generation,
+    and the content version of every cocktail. They are kept under the epoch
+    of the inventory generation, so they all go when it moves.
+    """
+    manifest_key = 'resolutions:manifest:%s:%s'
+
+    def __init__(self, inventory_id, items, tree, cocktails):
+        self.inventory_id = str(inventory_id)
+        self.items = items
+        self.tree = tree
+        self.cocktails = cocktails
+
+    @classmethod
+    def _key(cls, inventory_id):
+        return cls.manifest_key % (InventoryGeneration.epoch(), inventory_id)
+
+    @classmethod
+    def retrieve(cls, inventory_id):
+        """
+        Get the manifest of an inventory.
+        :param inventory_id: Inventory ID
+        :return: ResolutionManifest or None if the inventory was never resolved.
+        """
+        raw = flask_cache.get(cls._key(inventory_id))
+        if raw is None:
+            return None
+
+        return cls(inventory_id=inventory_id, **raw)
+
+    def save(self):
+        """
+        Store this manifest. Only do this once the results that it describes
+        have been saved.
+        :return: None
+        """
+        flask_cache.set(self._key(self.inventory_id),
+                        {'items': self.items, 'tree': self.tree, 'cocktails': self.cocktails}, timeout=0)
+
+    @classmethod
+    def invalidate(cls, inventory_id):
+        """
+        Forget the manifest of an inventory. Call this whenever its stored
+        resolutions are deleted.
+        :param inventory_id: Inventory ID
+        :return: None
+        """
+        flask_cache.delete(cls._key(inventory_id))
+
+
+class IncrementalRecipeResolver:
+    """
+    Re-resolve only the cocktails whose spec changed, or whose components are
+    related to inventory items that were added or removed, since the last time
+    the inventory was resolved. Everything else comes from the stored
+    RecipeResolutions.
+    """
+
+    @staticmethod
+    def _touched(slugs, tree=None):
+        """
+        Find every ingredient whose resolution could change if any of the given
+        ingredients were added to or removed from an inventory.
+        :param slugs: Set of ingredient slugs.
+        :param tree: IngredientTree. Retrieved from cache if needed and not given.
+        :return: Set of ingredient slugs.
+        """
+        if slugs and tree is None:
+            tree = IngredientTreeCache.retrieve()
+
+        touched = set(slugs)
+        for slug in slugs:
+            try:
+                substitution = tree.substitutions(slug)
+            except KeyError:
+                continue
+
+            for key in ['parents', 'children', 'siblings', 'implies']:
+                touched.update(substitution.get(key) or [])
+
+            implies_root = substitution.get('implies_root')
+            if implies_root:
+                touched.add(implies_root)
+                touched.update(tree.substitutions(implies_root).get('children') or [])
+
+        return touched
+
+    @staticmethod
+    def manifest(inventory, corpus):
+        """
+        Describe what resolving an inventory right now is based on. Build this
+        before resolving so that anything written in the meantime is caught
+        by the next run.
+        :param inventory: Inventory object.
+        :param corpus: List of CorpusEntry.
+        :return: ResolutionManifest
+        """
+        return ResolutionManifest(inventory_id=inventory.id, items=sorted(inventory.items.keys()),
+                                  tree=IngredientGeneration.current(),
+                                  cocktails={entry.slug: entry.digest for entry in corpus})
+
+    @classmethod
+    def iter_resolve(cls, inventory, manifest, corpus, progress=None, tree=None):
+        """
+        Resolve an inventory against the entire corpus one cocktail at a time,
+        in corpus order, reusing what we can.
+        :param inventory: Inventory object.
+        :param manifest: ResolutionManifest from manifest().
+        :param corpus: List of CorpusEntry.
+        :param progress: Optional function called as progress(completed, total) after each re-resolved cocktail.
+        :param tree: IngredientTree. Pass this in when resolving many inventories.
+        :return: Generator of (cocktail slug, List[RecipeResolutionSummary], Boolean of whether they were
+                 freshly resolved) tuples. Cocktails that are no longer in the corpus come last, freshly
+                 resolved to nothing.
+        """
+        previous = ResolutionManifest.retrieve(inventory.id)
+        stored = {}
+        if previous is not None and previous.tree == manifest.tree:
+            for rs in RecipeResolutionFactory.produce_all_objs_from_inventory(inventory_id=inventory.id):
+                stored.setdefault(rs.cocktail_slug, []).append(rs)
+            touched = cls._touched(set(manifest.items) ^ set(previous.items), tree=tree)
+        else:
+            touched = set()
+
+        stale = set()
+        for entry in corpus:
+            if entry.slug not in stored or previous.cocktails.get(entry.slug) != entry.digest or entry.components & touched:
+                stale.add(entry.slug)
+
+        completed = 0
+        for entry in corpus:
+            if entry.slug not in stale:
+                yield entry.slug, stored[entry.slug], False
+                continue
+
+            yield entry.slug, BatchRecipeResolver.resolve(inventory=inventory, cocktails=[entry.obj]), True
+            completed += 1
+            if progress:
+                progress(completed, len(stale))
+
+        if previous is not None:
+            for slug in sorted(set(previous.cocktails) - {entry.slug for entry in corpus}):
+                yield slug, [], True
+
+    @classmethod
+    def resolve(cls, inventory, progress=None, corpus=None, tree=None):
+        """
+        Resolve an inventory against the entire corpus, reusing what we can.
+        The caller is responsible for saving the fresh results and then the
+        manifest, in that order.
+        :param inventory: Inventory object.
+        :param progress: Optional function called as progress(completed, total) after each re-resolved cocktail.
+        :param corpus: List of CorpusEntry. Pass this in when resolving many inventories.
+        :param tree: IngredientTree. Pass this in when resolving many inventories.
+        :return: Tuple of (all results, freshly resolved results, Set of the cocktail slugs that those
+                 replace, ResolutionManifest)
+        """
+        if corpus is None:
+            corpus = CocktailCorpusCache.retrieve()
+        manifest = cls.manifest(inventory=inventory, corpus=corpus)
+
+        results = []
+        fresh = []
+        replaced = set()
+        for cocktail_slug, c_results, is_fresh in cls.iter_resolve(inventory=inventory, manifest=manifest, corpus=corpus,
+                                                                   progress=progress, tree=tree):
+            results += c_results
+            if is_fresh:
+                fresh += c_results
+                replaced.add(cocktail_slug)
+
+        return results, fresh, replaced, manifest
+
+
+def save_recipe_resolutions(fresh, replaced):
+    """
+    Save freshly resolved results. The stored results of the cocktails that
+    they replace are deleted first, since specs that were removed or renamed
+    would otherwise linger on.
+    :param fresh: List of RecipeResolutionSummary.
+    :param replaced: Dict of inventory ID to Set of the cocktail slugs that were re-resolved.
+    :return: None
+    """
+    for inventory_id, cocktail_slugs in replaced.items():
+        if not cocktail_slugs:
+            continue
+        BulkFactory.delete_by(RecipeResolutionFactory, inventory_id=inventory_id, cocktail_slug=sorted(cocktail_slugs))
+        BulkIndexer.delete_by(RecipeResolutionIndex, inventory_id=inventory_id, cocktail_slug=sorted(cocktail_slugs))
+
+    BulkFactory.upsert_objs(RecipeResolutionFactory, fresh)
+    BulkIndexer.index(RecipeResolutionIndexer, fresh)
+
+
+def iter_inventory_recipes(i, job=None):
+    """
+    Resolve an inventory against the entire corpus, yielding each result as
+    soon as it is available. Everything is saved once the last one is out.
+    :param i: Inventory object.
+    :param job: Optional Job to report progress to.
+    :return: Generator of serialized RecipeResolutionSummary dicts.
+    """
+    corpus = CocktailCorpusCache.retrieve()
+    manifest = IncrementalRecipeResolver.manifest(inventory=i, corpus=corpus)
+
+    fresh = []
+    replaced = set()
+    for cocktail_slug, c_results, is_fresh in IncrementalRecipeResolver.iter_resolve(
+            inventory=i, manifest=manifest, corpus=corpus, progress=job.progress if job else None):
+        if is_fresh:
+            fresh += c_results
+            replaced.add(cocktail_slug)
+        for rs in c_results:
+            yield ObjectSerializer.serialize(rs, 'dict')
+
+    # Save the things we got. Only then can we record what they came from.
+    save_recipe_resolutions(fresh=fresh, replaced={i.id: replaced})
+    manifest.save()
+
+
+def resolve_inventory_recipes(id, job=None):
+    """
+    Resolve an inventory against the entire corpus and save the results.
+    :param id: GUID of the inventory.
+    :param job: Optional Job to report progress to.
+    :return: List of serialized RecipeResolutionSummary dicts.
+    """
+    i = InventoryFactory.produce_obj(id=id)
+    return list(iter_inventory_recipes(i=i, job=job))
+
+
+def resolve_inventories_recipes(inventories, job=None):
+    """
+    Resolve many inventories against the entire corpus and save the results.
+    The corpus and ingredient tree are loaded once and shared by all of them,
+    and everything is saved in one go at the end.
+    :param inventories: List of Inventory objects.
+    :param job: Optional Job to report progress to.
+    :return: Tuple of (Dict of inventory ID to serialized results, Dict of throughput stats)
+    """
+    start = time.time()
+    corpus = CocktailCorpusCache.retrieve()
+    tree = IngredientTreeCache.retrieve()
+
+    results = {}
+    fresh = []
+    replaced = {}
+    manifests = []
+    for index, i in enumerate(inventories):
+        i_results, i_fresh, replaced[i.id], manifest = IncrementalRecipeResolver.resolve(inventory=i, corpus=corpus,
+                                                                                         tree=tree)
+        results[str(i.id)] = [ObjectSerializer.serialize(rs, 'dict') for rs in i_results]
+        fresh += i_fresh
+        manifests.append(manifest)
+        if job:
+            job.progress(index + 1, len(inventories))
+
+    save_recipe_resolutions(fresh=fresh, replaced=replaced)
+    [manifest.save() for manifest in manifests]
+
+    seconds = time.time() - start
+    resolutions = sum(len(i_results) for i_results in results.values())
+    stats = {
+        'inventories': len(inventories),
+        'resolutions': resolutions,
+        'resolved': len(fresh),
+        'seconds': seconds,
+        'inventories_per_second': len(inventories) / seconds if seconds else None,
+        'resolutions_per_second': resolutions / seconds if seconds else None,
+    }
+
+    return results, stats
+
+
+def reindex_inventories(slugs, trees=None):
+    """
+    Re-index the expanded form of every inventory that could expand
+    differently now that some ingredients were written. Only inventories
+    holding one of the related ingredients are loaded. Call this after the
+    ingredient tree cache has been invalidated.
+    :param slugs: Set of ingredient slugs that were written.
+    :param trees: List of IngredientTree from before the write, to also catch
+                  inventories affected by where the ingredients used to be.
+    :return: Number of inventories re-indexed.
+    """
+    touched = set()
+    for tree in (trees or []) + [IngredientTreeCache.retrieve()]:
+        touched |= IncrementalRecipeResolver._touched(slugs, tree=tree)
+
+    ids = BulkFactory.ids_with_keys(InventoryFactory, 'items', touched)
+    BulkIndexer.index(InventoryIndexer, [InventoryFactory.produce_obj(id=id, expand=True) for id in ids])
+    for id in ids:
+        InventoryGeneration.bump(id)
+
+    return len(ids)
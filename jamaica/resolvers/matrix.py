@@ -0,0 +1,207 @@
+import numpy
+from jamaica.cache.local import LocalCacheBase, CocktailCorpusCache
+from jamaica.cache.generation import CocktailGeneration, IngredientGeneration
+from jamaica.resolvers import InventoryItemResolver
+
+from barbados.caches.ingredienttree import IngredientTreeCache
+from barbados.caches.tablescan import IngredientScanCache
+
+
+class Status:
+    """
+    Component resolution statuses, in order of preference.
+    """
+    DIRECT = 'DIRECT'
+    IMPLICIT = 'IMPLICIT'
+    SUBSTITUTE = 'SUBSTITUTE'
+    MISSING = 'MISSING'
+
+    ordered = [DIRECT, IMPLICIT, SUBSTITUTE, MISSING]
+
+
+class RecipeMatrix:
+    """
+    Every component of every spec in the corpus laid out as rows of bitsets
+    over the ingredient catalog, one matrix per way that an inventory can
+    satisfy a component:
+      * direct: the component itself.
+      * implicit: anything below the component in the ingredient tree.
+      * substitute: siblings, the parent, and anything the component implies,
+        as long as they are within its implies_root.
+    An inventory is a bitset over the same catalog, so resolving any number
+    of inventories against the whole corpus is a handful of array operations.
+    """
+    # Bounds the size of the intermediate (inventories x components x bytes) arrays.
+    chunk_size = 64
+
+    def __init__(self, ingredients, specs, offsets, direct, implicit, substitute):
+        """
+        :param ingredients: Dict of ingredient slug to column index.
+        :param specs: List of (cocktail_slug, spec_slug, construction_slug) tuples.
+        :param offsets: Array of the first component row of each spec, plus the total.
+        :param direct: Packed bitset matrix (components x ingredients).
+        :param implicit: Packed bitset matrix (components x ingredients).
+        :param substitute: Packed bitset matrix (components x ingredients).
+        """
+        self.ingredients = ingredients
+        self.specs = specs
+        self.offsets = offsets
+        self.direct = direct
+        self.implicit = implicit
+        self.substitute = substitute
+
+    @classmethod
+    def build(cls, corpus, tree, ingredient_slugs):
+        """
+        Build the matrix for a corpus.
+        :param corpus: List of CorpusEntry.
+        :param tree: IngredientTree.
+        :param ingredient_slugs: List of every ingredient slug in the catalog.
+        :return: RecipeMatrix
+        """
+        ingredients = {}
+        for slug in ingredient_slugs:
+            ingredients.setdefault(slug, len(ingredients))
+
+        specs = []
+        offsets = [0]
+        rows = []
+        relations = {}
+        for entry in corpus:
+            for spec in entry.raw.get('specs', []):
+                construction = spec.get('construction') or {}
+                specs.append((entry.slug, spec.get('slug'), construction.get('slug')))
+                for component in spec.get('components', []):
+                    slug = component.get('slug')
+                    if slug not in relations:
+                        relations[slug] = cls._relations(tree, slug)
+                    rows.append(relations[slug])
+                offsets.append(len(rows))
+
+        for direct, implicit, substitute in relations.values():
+            for slug in direct | implicit | substitute:
+                ingredients.setdefault(slug, len(ingredients))
+
+        matrices = []
+        for kind in range(3):
+            matrix = numpy.zeros((len(rows), len(ingredients)), dtype=bool)
+            for row, relation in enumerate(rows):
+                matrix[row, [ingredients[slug] for slug in relation[kind]]] = True
+            matrices.append(numpy.packbits(matrix, axis=1))
+
+        return cls(ingredients, specs, numpy.array(offsets), *matrices)
+
+    @staticmethod
+    def _relations(tree, slug):
+        """
+        Work out which ingredients satisfy a component, and how.
+        :param tree: IngredientTree.
+        :param slug: Component slug.
+        :return: Tuple of (direct, implicit, substitute) sets of slugs.
+        """
+        direct = {slug}
+        try:
+            substitution = tree.substitutions(slug)
+        except KeyError:
+            return direct, set(), set()
+
+        implicit = set(substitution.get('children') or []) - direct
+        substitute = set(substitution.get('siblings') or []) | set(substitution.get('implies') or [])
+        if substitution.get('parent'):
+            substitute.add(substitution.get('parent'))
+
+        # The same cutoff that the item resolver applies to what an ingredient implies.
+        scope = InventoryItemResolver.scope(tree, slug, substitution)
+        if scope is not None:
+            substitute &= scope
+
+        return direct, implicit, substitute - direct - implicit
+
+    def bitset(self, slugs):
+        """
+        Turn a collection of ingredient slugs into a packed bitset.
+        Anything not in the catalog can't satisfy a component and is ignored.
+        :param slugs: Iterable of ingredient slugs.
+        :return: numpy.ndarray
+        """
+        bits = numpy.zeros(len(self.ingredients), dtype=bool)
+        bits[[self.ingredients[slug] for slug in slugs if slug in self.ingredients]] = True
+        return numpy.packbits(bits)
+
+    def statuses(self, bitsets):
+        """
+        Resolve every component against a stack of inventory bitsets.
+        :param bitsets: numpy.ndarray (inventories x bytes).
+        :return: numpy.ndarray (inventories x components) of indexes into Status.ordered.
+        """
+        codes = numpy.full((len(bitsets), len(self.direct)), Status.ordered.index(Status.MISSING), dtype=numpy.int8)
+        for start in range(0, len(bitsets), self.chunk_size):
+            chunk = bitsets[start:start + self.chunk_size, None, :]
+            # Least preferred first so that better statuses overwrite.
+            for status, matrix in [(Status.SUBSTITUTE, self.substitute), (Status.IMPLICIT, self.implicit), (Status.DIRECT, self.direct)]:
+                hits = (matrix[None, :, :] & chunk).any(axis=2)
+                codes[start:start + self.chunk_size][hits] = Status.ordered.index(status)
+
+        return codes
+
+    def status_counts(self, bitsets):
+        """
+        Count the component statuses of every spec for a stack of inventories.
+        :param bitsets: numpy.ndarray (inventories x bytes).
+        :return: numpy.ndarray (inventories x specs x statuses)
+        """
+        codes = self.statuses(bitsets)
+        counts = numpy.zeros((len(bitsets), len(self.specs), len(Status.ordered)), dtype=numpy.int32)
+        if not codes.shape[1]:
+            return counts
+
+        starts = self.offsets[:-1]
+        empty = starts == self.offsets[1:]
+        for index in range(len(Status.ordered)):
+            # reduceat() needs in-bounds starts and repeats a row for empty ranges, so mask those back out.
+            summed = numpy.add.reduceat((codes == index).astype(numpy.int32), numpy.minimum(starts, codes.shape[1] - 1), axis=1)
+            summed[:, empty] = 0
+            counts[:, :, index] = summed
+
+        return counts
+
+    def summarize(self, inventories):
+        """
+        Resolve inventories against the whole corpus.
+        :param inventories: Dict of inventory ID to an iterable of its item slugs.
+        :return: Dict of inventory ID to a list of summary dicts.
+        """
+        ids = list(inventories.keys())
+        if not ids:
+            return {}
+
+        counts = self.status_counts(numpy.stack([self.bitset(inventories[id]) for id in ids]))
+
+        results = {}
+        for inventory_index, id in enumerate(ids):
+            results[id] = []
+            for spec_index, (cocktail_slug, spec_slug, construction_slug) in enumerate(self.specs):
+                spec_counts = counts[inventory_index, spec_index]
+                results[id].append({
+                    'inventory_id': str(id),
+                    'cocktail_slug': cocktail_slug,
+                    'spec_slug': spec_slug,
+                    'construction_slug': construction_slug,
+                    'component_count': int(spec_counts.sum()),
+                    'status_count': {status: int(spec_counts[index]) for index, status in enumerate(Status.ordered)},
+                })
+
+        return results
+
+
+class RecipeMatrixCache(LocalCacheBase):
+    """
+    The RecipeMatrix of the current corpus and ingredient tree.
+    """
+    generations = [CocktailGeneration, IngredientGeneration]
+
+    @classmethod
+    def populate(cls):
+        ingredient_slugs = [raw_i.get('slug') for raw_i in IngredientScanCache.retrieve()]
+        return RecipeMatrix.build(corpus=CocktailCorpusCache.retrieve(), tree=IngredientTreeCache.retrieve(),
+                                  ingredient_slugs=ingredient_slugs)
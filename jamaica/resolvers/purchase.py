@@ -0,0 +1,84 @@
+import numpy
+from jamaica.resolvers.matrix import Status
+
+from barbados.caches.tablescan import IngredientScanCache
+
+
+class PurchaseOptimizer:
+    """
+    Pick the ingredients that, added to an inventory, make the most additional
+    specs in the corpus makeable. This is greedy set cover over the RecipeMatrix:
+    each round takes the ingredient that completes the most specs, which is one
+    pass over the components that are still missing.
+    """
+    # Kinds of ingredient that you can't actually go out and buy.
+    unpurchasable_kinds = ['category', 'family', 'index']
+
+    def __init__(self, matrix):
+        """
+        :param matrix: RecipeMatrix
+        """
+        self.matrix = matrix
+        # Every way an ingredient can satisfy a component, unpacked to (components x ingredients).
+        self.satisfiers = numpy.unpackbits(matrix.direct | matrix.implicit | matrix.substitute, axis=1,
+                                           count=len(matrix.ingredients)).astype(bool)
+        self.spec_of_row = numpy.repeat(numpy.arange(len(matrix.specs)), numpy.diff(matrix.offsets))
+        self.slugs = sorted(matrix.ingredients, key=matrix.ingredients.get)
+
+    @classmethod
+    def candidates(cls):
+        """
+        Every ingredient that could be bought.
+        :return: List of ingredient slugs.
+        """
+        return [raw_i.get('slug') for raw_i in IngredientScanCache.retrieve() if raw_i.get('kind') not in cls.unpurchasable_kinds]
+
+    def optimize(self, items, count, candidates=None):
+        """
+        Find the best ingredients to add to an inventory.
+        :param items: Iterable of ingredient slugs already in the inventory.
+        :param count: Int of how many ingredients to pick.
+        :param candidates: Iterable of ingredient slugs to pick from. Defaults to anything not already owned.
+        :return: List of dicts of the ingredient slug and the specs that it unlocks, in the order picked.
+        """
+        items = set(items)
+        codes = self.matrix.statuses(self.matrix.bitset(items)[None, :])[0]
+        unsatisfied = codes == Status.ordered.index(Status.MISSING)
+        missing = numpy.bincount(self.spec_of_row[unsatisfied], minlength=len(self.matrix.specs))
+
+        allowed = numpy.zeros(len(self.slugs), dtype=bool)
+        if candidates is None:
+            candidates = self.slugs
+        allowed[[self.matrix.ingredients[slug] for slug in candidates if slug in self.matrix.ingredients]] = True
+        allowed[[self.matrix.ingredients[slug] for slug in items if slug in self.matrix.ingredients]] = False
+
+        picks = []
+        while len(picks) < count and unsatisfied.any():
+            rows = numpy.flatnonzero(unsatisfied)
+            coverage = self.satisfiers[rows]
+
+            # Rows are in spec order, so each spec's missing components are one contiguous run.
+            specs, starts = numpy.unique(self.spec_of_row[rows], return_index=True)
+            covered = numpy.add.reduceat(coverage.astype(numpy.int32), starts, axis=0)
+            unlocked = covered == missing[specs][:, None]
+
+            gain = numpy.where(allowed, unlocked.sum(axis=0), -1)
+            best = int(gain.argmax())
+            if gain[best] <= 0:
+                # Nothing completes a spec on its own, so take whatever closes the most gaps.
+                progress = numpy.where(allowed, coverage.sum(axis=0), -1)
+                best = int(progress.argmax())
+                if progress[best] <= 0:
+                    break
+
+            picks.append({
+                'slug': self.slugs[best],
+                'unlocks': [{'cocktail_slug': self.matrix.specs[spec][0], 'spec_slug': self.matrix.specs[spec][1]}
+                            for spec in specs[unlocked[:, best]]]
+            })
+
+            allowed[best] = False
+            unsatisfied[rows[coverage[:, best]]] = False
+            missing = numpy.bincount(self.spec_of_row[unsatisfied], minlength=len(self.matrix.specs))
+
+        return picks
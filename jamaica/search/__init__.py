@@ -0,0 +1,209 @@
+import re
+import numpy
+from jamaica.cache.local import LocalCacheBase
+from jamaica.cache.generation import CocktailGeneration
+
+from barbados.caches.tablescan import CocktailScanCache
+from barbados.exceptions import ValidationException
+
+
+class CocktailQueryEngine:
+    """
+    Every spec in the corpus as one row, with inverted postings for the
+    keyword filters and a column per field for everything else. Structured
+    queries are answered by AND-ing boolean masks over the rows, so they
+    never leave the process. Only full-text scoring (name and all) needs
+    the search backend.
+    """
+    # Arguments that need the search backend for matching and scoring.
+    fulltext_args = ['name', 'all']
+
+    def __init__(self, hits, postings, component_counts, garnished, text):
+        """
+        :param hits: List of Dicts shaped like the source of a CocktailSearch hit, one per row.
+        :param postings: Dict of argument name to Dict of value to Array of row numbers.
+        :param component_counts: Array of the number of components of each row.
+        :param garnished: Boolean array of whether each row has a garnish.
+        :param text: Dict of argument name to List of lowercase text of each row.
+        """
+        self.hits = hits
+        self.postings = postings
+        self.component_counts = component_counts
+        self.garnished = garnished
+        self.text = text
+        self.rows = {(hit.get('slug'), hit.get('spec').get('slug')): row for row, hit in enumerate(hits)}
+
+    @staticmethod
+    def _alpha(slug):
+        """
+        The letter a cocktail is listed under. Numbers are all listed under #.
+        :param slug: Cocktail slug.
+        :return: String
+        """
+        first = (slug or '#')[0].lower()
+        return '#' if first.isdigit() else first
+
+    @classmethod
+    def build(cls, cocktails):
+        """
+        Build the engine for a corpus.
+        :param cocktails: List of serialized Cocktail dicts.
+        :return: CocktailQueryEngine
+        """
+        hits = []
+        postings = {'alpha': {}, 'construction': {}, 'components': {}}
+        component_counts = []
+        garnished = []
+        text = {'citation_name': [], 'citation_author': [], 'instructions': []}
+
+        for raw_c in sorted(cocktails, key=lambda raw_c: raw_c.get('slug')):
+            for spec in raw_c.get('specs', []):
+                row = len(hits)
+                hits.append({'slug': raw_c.get('slug'), 'display_name': raw_c.get('display_name'), 'spec': spec})
+
+                construction = spec.get('construction') or {}
+                components = {component.get('slug') for component in spec.get('components', [])}
+                postings['alpha'].setdefault(cls._alpha(raw_c.get('slug')), []).append(row)
+                postings['construction'].setdefault(construction.get('slug'), []).append(row)
+                for component in components:
+                    postings['components'].setdefault(component, []).append(row)
+
+                component_counts.append(len(spec.get('components', [])))
+                garnished.append(bool(spec.get('garnish')))
+
+                citations = (raw_c.get('citations') or []) + (spec.get('citations') or [])
+                text['citation_name'].append(' '.join(citation.get('title') or '' for citation in citations).lower())
+                text['citation_author'].append(' '.join(author for citation in citations
+                                                        for author in citation.get('author') or []).lower())
+                text['instructions'].append(' '.join(instruction.get('text') or ''
+                                                     for instruction in spec.get('instructions') or []).lower())
+
+        postings = {arg: {value: numpy.array(rows, dtype=numpy.int32) for value, rows in values.items()}
+                    for arg, values in postings.items()}
+
+        return cls(hits=hits, postings=postings, component_counts=numpy.array(component_counts, dtype=numpy.int32),
+                   garnished=numpy.array(garnished, dtype=bool), text=text)
+
+    def _posting(self, arg, value):
+        """
+        Rows with a value for an argument, as a mask.
+        :param arg: Argument name.
+        :param value: Value to look up.
+        :return: Boolean array.
+        """
+        mask = numpy.zeros(len(self.hits), dtype=bool)
+        mask[self.postings[arg].get(value, [])] = True
+        return mask
+
+    def _keys(self, keys):
+        """
+        Rows of a set of specs, as a mask.
+        :param keys: Iterable of (cocktail_slug, spec_slug) tuples.
+        :return: Boolean array.
+        """
+        mask = numpy.zeros(len(self.hits), dtype=bool)
+        mask[[self.rows[key] for key in keys if key in self.rows]] = True
+        return mask
+
+    def _component(self, slug, postings=None):
+        """
+        Rows using a component, as a mask.
+        :param slug: Ingredient slug.
+        :param postings: ComponentPostings to also match anything below the ingredient in the tree.
+        :return: Boolean array.
+        """
+        if postings is None:
+            return self._posting('components', slug)
+        return self._keys(postings.lookup(slug))
+
+    @staticmethod
+    def _range(value):
+        """
+        Parse a component_count, which is either a number (3), an inclusive
+        range (3-5), or a lower bound (3+).
+        :param value: String
+        :return: Tuple of (minimum, maximum or None)
+        :raises ValidationException: not one of those.
+        """
+        match = re.fullmatch(r'\s*(\d+)\s*(?:(-)\s*(\d+)|(\+))?\s*', value)
+        if not match:
+            raise ValidationException("Invalid component_count %s. Use a number (3), range (3-5), or minimum (3+)." % value)
+
+        minimum = int(match.group(1))
+        if match.group(4):
+            return minimum, None
+        if match.group(2):
+            return minimum, int(match.group(3))
+        return minimum, minimum
+
+    def mask(self, alpha=None, construction=None, components=None, no_components=None, component_count=None,
+             garnish=None, citation_name=None, citation_author=None, instructions=None, postings=None, **kwargs):
+        """
+        Find the rows matching every given structured argument.
+        :param postings: ComponentPostings to match components anywhere below the given ones in the tree.
+        :return: Boolean array.
+        """
+        mask = numpy.ones(len(self.hits), dtype=bool)
+
+        if alpha:
+            mask &= self._posting('alpha', self._alpha(alpha))
+        if construction:
+            mask &= self._posting('construction', construction)
+        for component in components or []:
+            mask &= self._component(component, postings)
+        for component in no_components or []:
+            mask &= ~self._component(component, postings)
+
+        if component_count:
+            minimum, maximum = self._range(component_count)
+            mask &= self.component_counts >= minimum
+            if maximum is not None:
+                mask &= self.component_counts <= maximum
+        if garnish is not None:
+            mask &= self.garnished == garnish
+
+        for arg, value in [('citation_name', citation_name), ('citation_author', citation_author),
+                           ('instructions', instructions)]:
+            if value:
+                value = value.lower()
+                mask &= numpy.array([value in row_text for row_text in self.text[arg]], dtype=bool)
+
+        return mask
+
+    def needs_fulltext(self, args):
+        """
+        :param args: Dict of parsed cocktail_list_parser arguments.
+        :return: Boolean of whether the search backend is needed.
+        """
+        return any(args.get(arg) for arg in self.fulltext_args)
+
+    def query(self, fulltext=None, postings=None, **args):
+        """
+        Search the corpus.
+        :param fulltext: List of (cocktail_slug, spec_slug, score) tuples from the search
+                         backend for the name and all arguments, in order. Required if
+                         needs_fulltext().
+        :param postings: ComponentPostings to match components anywhere below the given ones in the tree.
+        :param args: Parsed cocktail_list_parser arguments.
+        :return: List of Dicts with score and hit, for marshalling as CocktailSearchItem.
+        """
+        mask = self.mask(postings=postings, **args)
+
+        if fulltext is None:
+            return [{'score': 1.0, 'hit': self.hits[row]} for row in numpy.flatnonzero(mask)]
+
+        results = []
+        for cocktail_slug, spec_slug, score in fulltext:
+            row = self.rows.get((cocktail_slug, spec_slug))
+            if row is not None and mask[row]:
+                results.append({'score': score, 'hit': self.hits[row]})
+
+        return results
+
+
+class CocktailQueryEngineCache(LocalCacheBase):
+    generations = [CocktailGeneration]
+
+    @classmethod
+    def populate(cls):
+        return CocktailQueryEngine.build(CocktailScanCache.retrieve())
@@ -0,0 +1,157 @@
+from jamaica.cache.local import LocalCacheBase, CocktailCorpusCache
+from jamaica.cache.generation import CocktailGeneration, IngredientGeneration
+
+from barbados.caches.ingredienttree import IngredientTreeCache
+
+
+class ComponentPostings:
+    """
+    Which specs use an ingredient, either directly or through something
+    below it in the ingredient tree. Every spec is posted under each of its
+    components and all of their ancestors, so "any rum" is one lookup.
+    Specs are identified by (cocktail_slug, spec_slug).
+    """
+
+    def __init__(self):
+        self.tree_generation = None
+        # Cocktail slug to content version.
+        self.digests = {}
+        # Cocktail slug to Dict of spec slug to Set of component slugs.
+        self.specs = {}
+        # Component slug to Set of itself and its ancestors.
+        self.ancestors = {}
+        # Component slug to Set of spec keys that list it.
+        self.uses = {}
+        # Ingredient slug to Dict of spec key to the number of its components
+        # that are this ingredient or below it.
+        self.postings = {}
+
+    def copy(self):
+        """
+        Make a copy that can be updated without disturbing anyone still
+        reading this one.
+        :return: ComponentPostings
+        """
+        postings = ComponentPostings()
+        postings.tree_generation = self.tree_generation
+        postings.digests = dict(self.digests)
+        postings.specs = dict(self.specs)
+        postings.ancestors = dict(self.ancestors)
+        postings.uses = {slug: set(keys) for slug, keys in self.uses.items()}
+        postings.postings = {slug: dict(counts) for slug, counts in self.postings.items()}
+        return postings
+
+    @staticmethod
+    def _lineage(tree, slug):
+        """
+        Get an ingredient and everything above it in the tree.
+        :param tree: IngredientTree
+        :param slug: Ingredient slug.
+        :return: Set of ingredient slugs.
+        """
+        try:
+            parents = tree.substitutions(slug).get('parents') or []
+        except KeyError:
+            parents = []
+
+        return {slug} | set(parents)
+
+    def _add(self, slugs, key, delta):
+        for slug in slugs:
+            counts = self.postings.setdefault(slug, {})
+            counts[key] = counts.get(key, 0) + delta
+            if not counts[key]:
+                del counts[key]
+            if not counts:
+                del self.postings[slug]
+
+    def _post(self, tree, cocktail_slug, specs, delta):
+        for spec_slug, components in specs.items():
+            key = (cocktail_slug, spec_slug)
+            for component in components:
+                if component not in self.ancestors:
+                    self.ancestors[component] = self._lineage(tree, component)
+                uses = self.uses.setdefault(component, set())
+                if delta > 0:
+                    uses.add(key)
+                else:
+                    uses.discard(key)
+                self._add(self.ancestors[component], key, delta)
+
+    def _retree(self, tree):
+        """
+        Move the specs of every component whose place in the tree changed.
+        :param tree: IngredientTree
+        :return: Number of components that moved.
+        """
+        moved = 0
+        for component, keys in self.uses.items():
+            before = self.ancestors.get(component, set())
+            after = self._lineage(tree, component)
+            if before == after:
+                continue
+
+            for key in keys:
+                self._add(before - after, key, -1)
+                self._add(after - before, key, 1)
+            self.ancestors[component] = after
+            moved += 1
+
+        return moved
+
+    def update(self, corpus, tree, tree_generation):
+        """
+        Bring the postings up to date. Only cocktails whose content changed
+        are re-posted, and only components whose ancestors changed are moved.
+        :param corpus: List of CorpusEntry.
+        :param tree: IngredientTree.
+        :param tree_generation: Generation of the ingredient tree.
+        :return: Tuple of (number of cocktails re-posted, number of components moved)
+        """
+        moved = 0
+        if tree_generation != self.tree_generation:
+            moved = self._retree(tree)
+            self.tree_generation = tree_generation
+
+        current = {entry.slug: entry for entry in corpus}
+        for slug in [slug for slug in self.digests if slug not in current]:
+            self._post(tree, slug, self.specs.pop(slug), -1)
+            del self.digests[slug]
+
+        changed = 0
+        for slug, entry in current.items():
+            if self.digests.get(slug) == entry.digest:
+                continue
+
+            specs = {spec.get('slug'): {component.get('slug') for component in spec.get('components', [])}
+                     for spec in entry.raw.get('specs', [])}
+            self._post(tree, slug, self.specs.get(slug, {}), -1)
+            self._post(tree, slug, specs, 1)
+            self.digests[slug] = entry.digest
+            self.specs[slug] = specs
+            changed += 1
+
+        return changed, moved
+
+    def lookup(self, slug):
+        """
+        Get every spec that uses an ingredient or anything below it.
+        :param slug: Ingredient slug.
+        :return: Set of (cocktail_slug, spec_slug) tuples.
+        """
+        return set(self.postings.get(slug, {}))
+
+
+class ComponentPostingsCache(LocalCacheBase):
+    generations = [CocktailGeneration, IngredientGeneration]
+
+    @classmethod
+    def populate(cls):
+        return cls.refresh(None)
+
+    @classmethod
+    def refresh(cls, previous):
+        postings = previous.copy() if previous else ComponentPostings()
+        postings.update(corpus=CocktailCorpusCache.retrieve(), tree=IngredientTreeCache.retrieve(),
+                        tree_generation=IngredientGeneration.current())
+        return postings
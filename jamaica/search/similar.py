@@ -0,0 +1,176 @@
+import numpy
+from jamaica.cache.local import LocalCacheBase
+from jamaica.cache.generation import CocktailGeneration, IngredientGeneration
+from jamaica.search import CocktailQueryEngineCache
+
+from barbados.caches.ingredienttree import IngredientTreeCache
+
+
+class SimilarityIndex:
+    """
+    The closest specs to every spec by what goes in them. Each spec is a
+    unit vector over ingredients and similarity is the cosine between two of
+    them, so one matrix product scores a spec against the whole corpus. The
+    best of every spec are worked out once when the index is built, so a
+    lookup is a slice.
+
+    There are two of everything: one where only the same ingredient counts,
+    and one where a spec also partly has every ingredient above its
+    components in the tree. With the latter a daiquiri made with El Dorado
+    12 is still near one made with any other aged rum.
+    """
+    # Most results kept for each spec.
+    depth = 25
+    # How much of an ingredient its parent counts for, and so on up the tree.
+    ancestor_weight = 0.5
+    # Rows scored at a time, to bound the size of the similarity matrix.
+    block = 512
+
+    def __init__(self, hits, neighbors, scores):
+        """
+        :param hits: List of Dicts shaped like the source of a CocktailSearch hit, one per row.
+        :param neighbors: Dict of ancestors Boolean to Array of the best rows for each row, best first.
+        :param scores: Dict of ancestors Boolean to Array of the similarity of each of those.
+        """
+        self.hits = hits
+        self.neighbors = neighbors
+        self.scores = scores
+        self.rows = {(hit.get('slug'), hit.get('spec').get('slug')): row for row, hit in enumerate(hits)}
+        self.firsts = {}
+        for row, hit in enumerate(hits):
+            self.firsts.setdefault(hit.get('slug'), row)
+
+    @staticmethod
+    def _parents(tree, slug):
+        """
+        Get everything above an ingredient in the tree, nearest first.
+        :param tree: IngredientTree
+        :param slug: Ingredient slug.
+        :return: List of ingredient slugs.
+        """
+        try:
+            return tree.substitutions(slug).get('parents') or []
+        except KeyError:
+            return []
+
+    @classmethod
+    def _vectors(cls, hits, tree, ancestors):
+        """
+        Turn each spec into a unit vector over ingredients.
+        :param hits: List of hit Dicts.
+        :param tree: IngredientTree.
+        :param ancestors: Boolean of whether to partly count ingredients above each component.
+        :return: Array with a row per hit.
+        """
+        weights = []
+        columns = {}
+        lineages = {}
+        for hit in hits:
+            row = {}
+            for component in hit.get('spec').get('components', []):
+                slug = component.get('slug')
+                if slug is None:
+                    continue
+
+                row[slug] = 1.0
+                if not ancestors:
+                    continue
+                if slug not in lineages:
+                    lineages[slug] = cls._parents(tree, slug)
+                for level, parent in enumerate(lineages[slug], start=1):
+                    # Something used directly outweighs it being implied.
+                    row[parent] = max(row.get(parent, 0.0), cls.ancestor_weight ** level)
+
+            for slug in row:
+                columns.setdefault(slug, len(columns))
+            weights.append(row)
+
+        matrix = numpy.zeros((len(hits), len(columns)), dtype=numpy.float32)
+        for index, row in enumerate(weights):
+            for slug, weight in row.items():
+                matrix[index, columns[slug]] = weight
+
+        norms = numpy.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    @classmethod
+    def _top(cls, matrix, owners):
+        """
+        Find the best rows for every row. Rows of the same cocktail are
+        never counted, since every spec of a cocktail is trivially similar.
+        :param matrix: Array of unit vectors.
+        :param owners: Array of the cocktail number of each row.
+        :return: Tuple of (Array of rows, Array of similarities), best first. Similarities
+                 that are not positive are no match at all.
+        """
+        count = len(matrix)
+        depth = min(cls.depth, count)
+        neighbors = numpy.zeros((count, depth), dtype=numpy.int32)
+        scores = numpy.zeros((count, depth), dtype=numpy.float32)
+
+        for start in range(0, count, cls.block):
+            end = min(start + cls.block, count)
+            similarities = matrix[start:end] @ matrix.T
+            similarities[owners[start:end, None] == owners[None, :]] = -1
+
+            if depth < count:
+                best = numpy.argpartition(-similarities, depth - 1, axis=1)[:, :depth]
+            else:
+                best = numpy.tile(numpy.arange(count), (end - start, 1))
+            best_scores = numpy.take_along_axis(similarities, best, axis=1)
+
+            order = numpy.argsort(-best_scores, axis=1, kind='stable')
+            neighbors[start:end] = numpy.take_along_axis(best, order, axis=1)
+            scores[start:end] = numpy.take_along_axis(best_scores, order, axis=1)
+
+        return neighbors, scores
+
+    @classmethod
+    def build(cls, hits, tree):
+        """
+        Build the index for a corpus.
+        :param hits: List of hit Dicts, e.g. from the CocktailQueryEngine.
+        :param tree: IngredientTree.
+        :return: SimilarityIndex
+        """
+        cocktails = {}
+        owners = numpy.array([cocktails.setdefault(hit.get('slug'), len(cocktails)) for hit in hits], dtype=numpy.int32)
+
+        neighbors = {}
+        scores = {}
+        for ancestors in [False, True]:
+            neighbors[ancestors], scores[ancestors] = cls._top(cls._vectors(hits, tree, ancestors), owners)
+
+        return cls(hits=hits, neighbors=neighbors, scores=scores)
+
+    def similar(self, cocktail_slug, spec_slug=None, ancestors=False, limit=10):
+        """
+        Get the specs closest to one.
+        :param cocktail_slug: Slug of the cocktail.
+        :param spec_slug: Slug of the spec. Defaults to the first spec of the cocktail.
+        :param ancestors: Boolean of whether to partly count ingredients above each component.
+        :param limit: Maximum number of results.
+        :return: List of Dicts with score and hit, for marshalling as CocktailSearchItem.
+        :raises KeyError: no such cocktail or spec.
+        """
+        if spec_slug is None:
+            row = self.firsts.get(cocktail_slug)
+            if row is None:
+                raise KeyError("Cocktail %s not found." % cocktail_slug)
+        else:
+            row = self.rows.get((cocktail_slug, spec_slug))
+            if row is None:
+                raise KeyError("Spec %s of cocktail %s not found." % (spec_slug, cocktail_slug))
+
+        return [{'score': float(score), 'hit': self.hits[neighbor]}
+                for neighbor, score in zip(self.neighbors[ancestors][row][:limit], self.scores[ancestors][row][:limit])
+                if score > 0]
+
+
+class SimilarityIndexCache(LocalCacheBase):
+    generations = [CocktailGeneration, IngredientGeneration]
+
+    @classmethod
+    def populate(cls):
+        return SimilarityIndex.build(hits=CocktailQueryEngineCache.retrieve().hits, tree=IngredientTreeCache.retrieve())
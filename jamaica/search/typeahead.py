@@ -0,0 +1,260 @@
+import re
+import threading
+import unicodedata
+from jamaica.cache.local import LocalCacheBase
+from jamaica.cache.generation import CocktailGeneration, IngredientGeneration
+
+from barbados.caches.tablescan import CocktailScanCache, IngredientScanCache
+
+
+def normalize(text):
+    """
+    Fold a name down to lowercase ASCII words separated by single spaces so
+    that "Añejo  Rum" and "anejo rum" are the same thing.
+    :param text: String
+    :return: String
+    """
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+class TrieNode:
+    __slots__ = ['children', 'top']
+
+    def __init__(self):
+        self.children = {}
+        # Best entries ending at or below this node.
+        self.top = []
+
+
+class Typeahead:
+    """
+    A prefix trie over names. Every word of a name starts a key, so "rum"
+    finds "Aged Rum" as well as "Rum Punch". Each node keeps the best
+    entries below it, so a lookup is a walk down the query followed by a
+    slice. Small typos are tolerated by walking the trie with a bounded
+    edit distance instead.
+    """
+    # Most results that can be asked for.
+    limit = 25
+    # Most queries to remember the results of.
+    memo_size = 4096
+
+    def __init__(self, entries):
+        """
+        :param entries: List of Dicts, each with at least a display_name. An entry
+                        may have aliases, which are matched just the same.
+        """
+        self.entries = entries
+        self.root = TrieNode()
+        self._memo = {}
+        self._lock = threading.Lock()
+
+        for entry_id, entry in enumerate(entries):
+            for name in [entry.get('display_name')] + (entry.get('aliases') or []):
+                words = normalize(name).split(' ')
+                for start in range(len(words)):
+                    self._insert(' '.join(words[start:]), entry_id)
+
+        self._rank(self.root)
+
+    def _insert(self, key, entry_id):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, TrieNode())
+        if entry_id not in node.top:
+            node.top.append(entry_id)
+
+    def _order(self, entry_id):
+        # Shorter names are more likely to be what someone is typing.
+        display_name = self.entries[entry_id].get('display_name') or ''
+        return len(display_name), display_name
+
+    def _rank(self, node):
+        """
+        Fill in the best entries of every node, bottom up.
+        :param node: TrieNode
+        :return: None
+        """
+        # Recursion would go as deep as the longest name, so walk it instead.
+        stack = [(node, False)]
+        while stack:
+            node, visited = stack.pop()
+            if not visited:
+                stack.append((node, True))
+                stack += [(child, False) for child in node.children.values()]
+                continue
+
+            candidates = set(node.top)
+            for child in node.children.values():
+                candidates.update(child.top)
+            node.top = sorted(candidates, key=self._order)[:self.limit]
+
+    def _find(self, key):
+        node = self.root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+
+        return node
+
+    def _fuzzy(self, key, distance):
+        """
+        Find every node whose path is within an edit distance of the key.
+        :param key: Normalized query.
+        :param distance: Maximum number of edits.
+        :return: Dict of TrieNode to edit distance.
+        """
+        found = {}
+
+        # People rarely get the first letters wrong, and holding one fixed
+        # for each edit allowed saves walking almost all of the trie. Rows
+        # are edit distances from the path so far to each prefix of the key,
+        # and only the band within the distance of the diagonal can matter.
+        fixed = min(distance, len(key))
+        start = self._find(key[:fixed])
+        if start is None:
+            return found
+
+        # This runs for every node in the band, so it is written out by hand.
+        length = len(key)
+        over = distance + 1
+        first_row = [min(abs(fixed - column), over) for column in range(length + 1)]
+        stack = [(child, char, fixed + 1, first_row) for char, child in start.children.items()]
+        while stack:
+            node, char, depth, previous_row = stack.pop()
+
+            row = [over] * (length + 1)
+            low = max(1, depth - distance)
+            left = row[low - 1] = min(depth, over)
+            best = over
+            for column in range(low, min(length, depth + distance) + 1):
+                value = previous_row[column - 1] + (key[column - 1] != char)
+                if previous_row[column] + 1 < value:
+                    value = previous_row[column] + 1
+                if left + 1 < value:
+                    value = left + 1
+                if value > over:
+                    value = over
+                row[column] = left = value
+                if value < best:
+                    best = value
+
+            if row[length] <= distance:
+                found[node] = row[length]
+            # No row below can get under the smallest in this one, so once the
+            # whole key is matched that well everything below is already here.
+            if best < row[length] and best <= distance:
+                stack += [(child, child_char, depth + 1, row) for child_char, child in node.children.items()]
+
+        return found
+
+    def search(self, query, limit=10):
+        """
+        Find the names that a query is the start of.
+        :param query: What has been typed so far.
+        :param limit: Maximum number of results.
+        :return: List of (edit distance, entry) tuples, best first.
+        """
+        key = normalize(query)
+        limit = min(limit, self.limit)
+        if not key:
+            return []
+
+        # Everyone types the same few prefixes on their way to the same names.
+        results = self._memo.get((key, limit))
+        if results is None:
+            results = self._search(key, limit)
+            with self._lock:
+                if len(self._memo) >= self.memo_size:
+                    self._memo.clear()
+                self._memo[(key, limit)] = results
+
+        return [(edits, self.entries[entry_id]) for edits, entry_id in results]
+
+    def _search(self, key, limit):
+        """
+        :param key: Normalized query.
+        :param limit: Maximum number of results.
+        :return: List of (edit distance, entry ID) tuples, best first.
+        """
+        node = self._find(key)
+        results = [(0, entry_id) for entry_id in node.top[:limit]] if node else []
+
+        # Only guess at typos if there aren't enough real matches, and never
+        # for very short queries where everything is one edit away. Each edit
+        # allowed makes the walk much longer, so stop as soon as there are
+        # enough guesses that no further edit could beat.
+        if len(results) < limit and len(key) >= 3:
+            seen = {entry_id for _, entry_id in results}
+            guesses = {}
+            for distance in range(1, (1 if len(key) < 7 else 2) + 1):
+                for fuzzy_node, edits in self._fuzzy(key, distance).items():
+                    for entry_id in fuzzy_node.top:
+                        if entry_id not in seen and edits < guesses.get(entry_id, distance + 1):
+                            guesses[entry_id] = edits
+                if len(results) + len(guesses) >= limit:
+                    break
+
+            results += sorted(((edits, entry_id) for entry_id, edits in guesses.items()),
+                              key=lambda result: (result[0], self._order(result[1])))[:limit - len(results)]
+
+        return results
+
+
+class CocktailTypeaheadCache(LocalCacheBase):
+    """
+    Typeaheads over cocktail names and spec names.
+    """
+    generations = [CocktailGeneration]
+
+    @classmethod
+    def populate(cls):
+        cocktails = []
+        specs = []
+        for raw_c in CocktailScanCache.retrieve():
+            cocktails.append({'kind': 'cocktail', 'slug': raw_c.get('slug'), 'display_name': raw_c.get('display_name'),
+                              'cocktail_slug': raw_c.get('slug')})
+            for spec in raw_c.get('specs', []):
+                specs.append({'kind': 'spec', 'slug': spec.get('slug'), 'display_name': spec.get('display_name'),
+                              'cocktail_slug': raw_c.get('slug'), 'spec_slug': spec.get('slug')})
+
+        return {'cocktail': Typeahead(cocktails), 'spec': Typeahead(specs)}
+
+
+class IngredientTypeaheadCache(LocalCacheBase):
+    """
+    Typeahead over ingredient names and their aliases.
+    """
+    generations = [IngredientGeneration]
+
+    @classmethod
+    def populate(cls):
+        ingredients = [{'kind': 'ingredient', 'slug': raw_i.get('slug'), 'display_name': raw_i.get('display_name'),
+                        'aliases': raw_i.get('aliases') or []}
+                       for raw_i in IngredientScanCache.retrieve()]
+
+        return {'ingredient': Typeahead(ingredients)}
+
+
+def typeahead(query, kinds=None, limit=10):
+    """
+    Find cocktails, specs and ingredients whose names start with a query.
+    :param query: What has been typed so far.
+    :param kinds: List of kinds (cocktail, spec, ingredient) to look for. Defaults to all of them.
+    :param limit: Maximum number of results.
+    :return: List of entry Dicts with their edit distance, best first.
+    """
+    typeaheads = {}
+    typeaheads.update(CocktailTypeaheadCache.retrieve())
+    typeaheads.update(IngredientTypeaheadCache.retrieve())
+
+    results = []
+    for kind, kind_typeahead in typeaheads.items():
+        if kinds and kind not in kinds:
+            continue
+        results += kind_typeahead.search(query, limit=limit)
+
+    results.sort(key=lambda result: (result[0], len(result[1].get('display_name') or ''), result[1].get('display_name') or ''))
+    return [dict(entry, distance=edits) for edits, entry in results[:limit]]
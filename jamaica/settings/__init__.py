@@ -40,3 +40,16 @@ cognito_settings = Settings(
     COGNITO_LOGIN_REDIRECT_URL='http://localhost:8080/api/v1/auth/login/redirect',
     COGNITO_LOGOUT_REDIRECT_URL='http://localhost:8080/api/v1/auth/logout/redirect',
 )
+
+job_settings = Settings(
+    workers=Setting(path='/api/jobs/workers', env='AMARI_JOB_WORKERS', default=2, type_=int),
+    timeout=Setting(path='/api/jobs/timeout', env='AMARI_JOB_TIMEOUT', default=86400, type_=int),
+)
+
+search_cache_settings = Settings(
+    timeout=Setting(path='/api/search/cache_timeout', env='AMARI_SEARCH_CACHE_TIMEOUT', default=3600, type_=int),
+)
+
+object_cache_settings = Settings(
+    max_bytes=Setting(path='/api/objects/cache_max_bytes', env='AMARI_OBJECT_CACHE_MAX_BYTES', default=16777216, type_=int),
+)
@@ -1,5 +1,8 @@
 from flask_restx import Resource
 from jamaica.v1.restx import api
+from jamaica.cache.generation import GenerationBase
+from jamaica.cache.search import SearchCache
+from jamaica.cache.objects import ObjectCache
 
 from barbados.caches import Caches
 
@@ -19,6 +22,31 @@ class CachesEndpoint(Resource):
         return keys
 
 
+@ns.route('/search/stats')
+class SearchCacheStatsEndpoint(Resource):
+
+    @api.response(200, 'success')
+    def get(self):
+        """
+        Return the hits, misses and hit rate of every search cache.
+        :return: List[Dict]
+        """
+        return [cache.stats() for cache in SearchCache.instances]
+
+
+@ns.route('/objects/stats')
+class ObjectCacheStatsEndpoint(Resource):
+
+    @api.response(200, 'success')
+    def get(self):
+        """
+        Return the size, hits, misses and evictions of every object cache in
+        the process that answers.
+        :return: List[Dict]
+        """
+        return [cache.stats() for cache in ObjectCache.instances]
+
+
 @ns.route('/<string:key>')
 @api.doc(params={'key': 'A cache key.'})
 class CacheEndpoint(Resource):
@@ -32,6 +60,7 @@ class CacheEndpoint(Resource):
         """
         cache = Caches.get_cache(key)
         cache.invalidate()
+        [generation.bump() for generation in GenerationBase.for_cache(cache)]
 
     @api.response(200, 'successful population')
     def post(self, key):
@@ -1,34 +1,86 @@
 import json
-from flask_restx import Resource
+from flask import request
+from flask_restx import Resource, marshal
 from jamaica.v1.restx import api
 from jamaica.v1.serializers import CocktailSearchItem, TextItem
-from jamaica.v1.cocktails.serializers import CocktailItem, CitationItem
-from jamaica.v1.cocktails.parsers import cocktail_list_parser
-from flask_sqlalchemy_session import current_session
+from jamaica.v1.cocktails.serializers import CocktailItem, CitationItem, CocktailBulkItem
+from jamaica.v1.cocktails.parsers import cocktail_list_parser, cocktail_bulk_parser, cocktail_similar_parser
+from jamaica.cache.generation import CocktailGeneration, IngredientGeneration
+from jamaica.cache.payload import PayloadCache
+from jamaica.cache.etag import generation_etag
+from jamaica.cache.local import CollectionCacheBase
+from jamaica.v1.parsers import collection_parser
+from jamaica.bulk import BulkImporter, BulkFactory, BulkIndexer
+from jamaica.cache.search import SearchCache
+from jamaica.cache.objects import ObjectCache
+from jamaica.search import CocktailQueryEngineCache
+from jamaica.search.postings import ComponentPostingsCache
+from jamaica.search.similar import SimilarityIndexCache
 
 from barbados.search.cocktail import CocktailSearch
 from barbados.caches.tablescan import CocktailScanCache
-from barbados.caches.recipebibliography import RecipeBibliographyCache
 from barbados.caches.notebook import NotebookCache
+from barbados.caches.recipebibliography import RecipeBibliographyCache
 from barbados.factories.cocktail import CocktailFactory
 from barbados.serializers import ObjectSerializer
 from barbados.indexers.recipe import RecipeIndexer
+from barbados.indexes.recipe import RecipeIndex
 
 ns = api.namespace('v1/cocktails', description='Cocktail recipes.')
 
+cocktail_search = SearchCache(name='cocktails', search=CocktailSearch, model=CocktailSearchItem, generation=CocktailGeneration)
+
+
+class CocktailPayloadCache(PayloadCache):
+    cache_key = 'payload:cocktails'
+    cache = CocktailScanCache
+    model = CocktailItem
+    generations = [CocktailGeneration]
+
+
+class BibliographyPayloadCache(PayloadCache):
+    cache_key = 'payload:bibliography'
+    cache = RecipeBibliographyCache
+    model = CitationItem
+    generations = [CocktailGeneration]
+
+    @classmethod
+    def data(cls):
+        return json.loads(cls.cache.retrieve())
+
+
+class CocktailObjectCache(ObjectCache):
+    cache_key = 'cocktails'
+    factory = CocktailFactory
+    model = CocktailItem
+    object_generations = [CocktailGeneration]
+
+
+class CocktailCollectionCache(CollectionCacheBase):
+    cache = CocktailScanCache
+    model = CocktailItem
+    generations = [CocktailGeneration]
+
 
 @ns.route('')
 class CocktailsEndpoint(Resource):
 
-    @api.response(200, 'success')
-    @api.marshal_list_with(CocktailItem)
+    @api.response(200, 'success', [CocktailItem])
+    @api.expect(collection_parser, validate=True)
+    @generation_etag(CocktailGeneration)
     def get(self):
         """
         Return a list of all fully-detailed cocktail objects
+        Use after, limit and fields to get a page or only part of each object.
         :return: List[Dict]
         """
-        serialized_cocktails = CocktailScanCache.retrieve()
-        return serialized_cocktails
+        args = collection_parser.parse_args(strict=True)
+
+        # The whole thing is already serialized and compressed.
+        if all(value is None for value in args.values()):
+            return CocktailPayloadCache.response()
+
+        return CocktailCollectionCache.response(**args)
 
     @api.response(201, 'created')
     @api.expect(CocktailItem, validate=True)
@@ -41,9 +93,12 @@ class CocktailsEndpoint(Resource):
         c = CocktailFactory.raw_to_obj(api.payload)
         CocktailFactory.insert_obj(obj=c)
         RecipeIndexer.index(c)
+        BulkIndexer.refresh(RecipeIndex)
 
         # Invalidate Cache
         CocktailScanCache.invalidate()
+        CocktailGeneration.bump()
+        CocktailObjectCache.invalidate(c.slug)
 
         return ObjectSerializer.serialize(c, 'dict'), 201
 
@@ -53,15 +108,54 @@ class CocktailsEndpoint(Resource):
         Delete all cocktails from the database. There be dragons here.
         :return: Number of items deleted.
         """
-        objects = CocktailFactory.produce_all_objs()
-        for c in objects:
-            CocktailFactory.delete_obj(obj=c, commit=False)
+        count = BulkFactory.delete_all(CocktailFactory)
 
         RecipeIndexer.empty()
-        current_session.commit()
+        BulkIndexer.refresh(RecipeIndex)
         CocktailScanCache.invalidate()
+        # Moves every cocktail at once, so the object cache drops them all.
+        CocktailGeneration.bump_all()
+
+        return count, 204
 
-        return len(objects), 204
+
+@ns.route('/bulk')
+class CocktailsBulkEndpoint(Resource):
+
+    @api.response(201, 'created')
+    @api.response(400, 'nothing imported')
+    @api.expect(cocktail_bulk_parser, [CocktailItem])
+    @api.marshal_with(CocktailBulkItem)
+    def post(self):
+        """
+        Import many cocktails at once, as a JSON array or as newline-delimited
+        JSON (Content-Type: application/x-ndjson). Cocktails that fail are
+        reported by their position in the request and the rest are imported,
+        unless atomic is set.
+        :return: Slugs imported and errors.
+        """
+        args = cocktail_bulk_parser.parse_args()
+
+        raws, errors = BulkImporter.parse(request)
+        objs, validation_errors = BulkImporter.validate(model=CocktailItem, factory=CocktailFactory, raws=raws)
+        errors += validation_errors
+
+        if args.get('atomic') and errors:
+            return {'imported': [], 'errors': errors}, 400
+
+        saved, save_errors = BulkImporter.save(factory=CocktailFactory, indexer=RecipeIndexer, objs=objs,
+                                               overwrite=args.get('overwrite'), atomic=args.get('atomic'))
+        errors += save_errors
+
+        # Invalidate Cache
+        if saved:
+            BulkIndexer.refresh(RecipeIndex)
+            CocktailScanCache.invalidate()
+            CocktailGeneration.bump()
+            [CocktailObjectCache.invalidate(c.slug) for c in saved]
+
+        errors.sort(key=lambda error: error.get('index'))
+        return {'imported': [c.slug for c in saved], 'errors': errors}, 201 if saved or not errors else 400
 
 
 @ns.route('/search')
@@ -77,9 +171,8 @@ class CocktailSearchEndpoint(Resource):
     # and you'll get a good response (HTTP/200), but that seems like even more haxx. Note that if you don't do the -X GET
     # curl will infer you meant POST and do that instead, which is not allowed (HTTP/405)
     # https://github.com/pallets/flask/issues/1317
-    @api.response(200, 'success')
+    @api.response(200, 'success', [CocktailSearchItem])
     @api.expect(cocktail_list_parser, validate=True)
-    @api.marshal_list_with(CocktailSearchItem)
     def get(self):
         """
         Get a simplified view of cocktails from search. No search parameters means
@@ -87,20 +180,29 @@ class CocktailSearchEndpoint(Resource):
         :return: List of SearchResult Dicts
         """
         args = cocktail_list_parser.parse_args(strict=True)
+        hierarchy = args.pop('hierarchy')
 
         # Don't return any results if all parameters are empty.
         # https://stackoverflow.com/questions/35253971/how-to-check-if-all-values-of-a-dictionary-are-0
         if all(value is None for value in args.values()):
             return []
 
-        return CocktailSearch(**args).execute()
+        # Everything but full-text matching is answered in-process.
+        engine = CocktailQueryEngineCache.retrieve()
+        fulltext = None
+        if engine.needs_fulltext(args):
+            results = cocktail_search.execute(name=args.get('name'), all=args.get('all'))
+            fulltext = [(result.get('cocktail_slug'), result.get('spec_slug'), result.get('score')) for result in results]
+
+        postings = ComponentPostingsCache.retrieve() if hierarchy else None
+        return marshal(engine.query(fulltext=fulltext, postings=postings, **args), CocktailSearchItem)
 
 
 @ns.route('/<string:slug>')
 class CocktailEndpoint(Resource):
 
-    @api.response(200, 'success')
-    @api.marshal_with(CocktailItem)
+    @api.response(200, 'success', CocktailItem)
+    @generation_etag(CocktailGeneration)
     def get(self, slug):
         """
         Get a single cocktail from the database.
@@ -108,8 +210,8 @@ class CocktailEndpoint(Resource):
         :return: Serialized Cocktail
         :raises IntegrityError: Duplicate
         """
-        c = CocktailFactory.produce_obj(id=slug)
-        return ObjectSerializer.serialize(c, 'dict')
+        # Hot recipes are served from memory until they are written to.
+        return CocktailObjectCache.response(slug)
 
     @api.response(204, 'successful delete')
     def delete(self, slug):
@@ -120,30 +222,53 @@ class CocktailEndpoint(Resource):
         """
         c = CocktailFactory.produce_obj(id=slug)
         CocktailFactory.delete_obj(obj=c)
-        CocktailScanCache.invalidate()
         RecipeIndexer.delete(c)
+        BulkIndexer.refresh(RecipeIndex)
+
+        CocktailScanCache.invalidate()
+        CocktailGeneration.bump()
+        CocktailObjectCache.invalidate(slug)
         return None, 204
 
 
+@ns.route('/<string:slug>/similar')
+class CocktailSimilarEndpoint(Resource):
+
+    @api.response(200, 'success')
+    @api.expect(cocktail_similar_parser, validate=True)
+    @generation_etag(CocktailGeneration, IngredientGeneration)
+    @api.marshal_list_with(CocktailSearchItem)
+    def get(self, slug):
+        """
+        Get the specs closest to a cocktail by ingredients. The score is how
+        much of their composition they share, from 0 to 1.
+        :param slug: Cocktail slug.
+        :return: List of SearchResult Dicts, best first.
+        """
+        args = cocktail_similar_parser.parse_args(strict=True)
+        return SimilarityIndexCache.retrieve().similar(cocktail_slug=slug, spec_slug=args.get('spec'),
+                                                       ancestors=args.get('ancestors'), limit=args.get('limit'))
+
+
 @ns.route('/bibliography')
 class CocktailBibliographyEndpoint(Resource):
 
-    @api.response(200, 'success')
-    @api.marshal_list_with(CitationItem)
+    @api.response(200, 'success', [CitationItem])
+    @generation_etag(CocktailGeneration)
     def get(self):
         """
         Return a list of all Citation objects associated with every
         cocktail in the database. Citation needed? I think not!
         :return: List[Citation]
         """
-        serialized_citations = RecipeBibliographyCache.retrieve()
-        return json.loads(serialized_citations)
+        return BibliographyPayloadCache.response()
 
 
 @ns.route('/notebook')
 class CocktailNotebookEndpoint(Resource):
 
     @api.response(200, 'success')
+    @generation_etag(CocktailGeneration)
     @api.marshal_list_with(TextItem)
     def get(self):
         return json.loads(NotebookCache.retrieve())
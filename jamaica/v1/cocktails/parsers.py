@@ -13,3 +13,17 @@ cocktail_list_parser.add_argument('citation_name', type=str, help='Citation name
 cocktail_list_parser.add_argument('citation_author', type=str, help='Citation author keyword')
 cocktail_list_parser.add_argument('instructions', type=str, help='String in instructions')
 cocktail_list_parser.add_argument('all', type=str, help='All fields')
+cocktail_list_parser.add_argument('hierarchy', type=inputs.boolean, default=False,
+                                  help='Match components anywhere below the given ones in the ingredient tree, e.g. aged-rum for rum.')
+
+cocktail_bulk_parser = reqparse.RequestParser()
+cocktail_bulk_parser.add_argument('atomic', type=inputs.boolean, default=False, location='args',
+                                  help='Import nothing if any cocktail is invalid or already exists.')
+cocktail_bulk_parser.add_argument('overwrite', type=inputs.boolean, default=False, location='args',
+                                  help='Replace cocktails that already exist instead of reporting them as errors.')
+
+cocktail_similar_parser = reqparse.RequestParser()
+cocktail_similar_parser.add_argument('spec', type=str, help='Spec slug. Defaults to the first spec of the cocktail.')
+cocktail_similar_parser.add_argument('ancestors', type=inputs.boolean, default=False,
+                                     help='Count ingredients above the components in the ingredient tree as partial matches.')
+cocktail_similar_parser.add_argument('limit', type=inputs.int_range(1, 25), default=10, help='Maximum number of results.')
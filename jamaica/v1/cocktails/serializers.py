@@ -39,3 +39,15 @@ CocktailItem = api.inherit('CocktailItem', DisplayItemBase, {
     'notes': fields.List(fields.Nested(TextItem), description='Global notes on the drink.'),
     'images': fields.List(fields.Nested(CocktailImageItem), description='Reference images of the drink.'),
 })
+
+CocktailBulkErrorItem = api.model('CocktailBulkErrorItem', {
+    'index': fields.Integer(description='Position of the cocktail in the request.', example=3),
+    'slug': fields.String(description='Slug of the cocktail, if it had one.', example='martinez'),
+    'message': fields.String(description='What was wrong with it.', example='Cocktail already exists.'),
+    'errors': fields.Raw(description='Validation errors by field.'),
+})
+
+CocktailBulkItem = api.model('CocktailBulkItem', {
+    'imported': fields.List(fields.String, description='Slugs of the cocktails that were imported.'),
+    'errors': fields.List(fields.Nested(CocktailBulkErrorItem), description='Cocktails that were not imported.'),
+})
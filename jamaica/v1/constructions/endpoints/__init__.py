@@ -1,6 +1,9 @@
 from flask_restx import Resource
 from jamaica.v1.restx import api
-from flask_sqlalchemy_session import current_session
+from jamaica.cache.generation import ConstructionGeneration
+from jamaica.cache.payload import PayloadCache
+from jamaica.cache.etag import generation_etag
+from jamaica.bulk import BulkFactory
 
 from jamaica.v1.serializers import ConstructionItem
 
@@ -12,17 +15,24 @@ from barbados.serializers import ObjectSerializer
 ns = api.namespace('v1/constructions', description='Construction methods.')
 
 
+class ConstructionPayloadCache(PayloadCache):
+    cache_key = 'payload:constructions'
+    cache = ConstructionScanCache
+    model = ConstructionItem
+    generations = [ConstructionGeneration]
+
+
 @ns.route('')
 class ConstructionsEndpoint(Resource):
 
-    @api.response(200, 'success')
-    @api.marshal_list_with(ConstructionItem)
+    @api.response(200, 'success', [ConstructionItem])
+    @generation_etag(ConstructionGeneration)
     def get(self):
         """
         List all Constructions.
         :return: List of serialized Construction objects.
         """
-        return ConstructionScanCache.retrieve()
+        return ConstructionPayloadCache.response()
 
     @api.response(201, 'created')
     @api.expect(ConstructionItem, validate=True)
@@ -35,6 +45,7 @@ class ConstructionsEndpoint(Resource):
         c = ConstructionFactory.raw_to_obj(api.payload)
         ConstructionFactory.insert_obj(obj=c)
         ConstructionScanCache.invalidate()
+        ConstructionGeneration.bump()
         return ObjectSerializer.serialize(c, 'dict'), 201
 
     @api.response(204, 'successful delete')
@@ -43,12 +54,10 @@ class ConstructionsEndpoint(Resource):
         Delete all Constructions.
         :return: Count of deleted objects.
         """
-        objs = [ConstructionFactory.raw_to_obj(construction) for construction in ConstructionScanCache.retrieve()]
-        for c in objs:
-            ConstructionFactory.delete_obj(c, commit=False)
-        current_session.commit()
+        count = BulkFactory.delete_all(ConstructionFactory)
         ConstructionScanCache.invalidate()
-        return len(objs), 204
+        ConstructionGeneration.bump()
+        return count, 204
 
 
 @ns.route('/<string:slug>')
@@ -56,6 +65,7 @@ class ConstructionsEndpoint(Resource):
 class ConstructionEndpoint(Resource):
 
     @api.response(200, 'success')
+    @generation_etag(ConstructionGeneration)
     @api.marshal_with(ConstructionItem)
     def get(self, slug):
         """
@@ -78,6 +88,7 @@ class ConstructionEndpoint(Resource):
         c = ConstructionFactory.raw_to_obj(api.payload)
         ConstructionFactory.update_obj(obj=c, id_value=slug)
         ConstructionScanCache.invalidate()
+        ConstructionGeneration.bump()
         return ObjectSerializer.serialize(c, 'dict'), 200
 
     @api.response(204, 'successful delete')
@@ -90,4 +101,5 @@ class ConstructionEndpoint(Resource):
         c = ConstructionFactory.produce_obj(id=slug)
         ConstructionFactory.delete_obj(c)
         ConstructionScanCache.invalidate()
+        ConstructionGeneration.bump()
         return None, 204
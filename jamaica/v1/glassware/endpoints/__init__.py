@@ -1,6 +1,9 @@
 from flask_restx import Resource
 from jamaica.v1.restx import api
-from flask_sqlalchemy_session import current_session
+from jamaica.cache.generation import GlasswareGeneration
+from jamaica.cache.payload import PayloadCache
+from jamaica.cache.etag import generation_etag
+from jamaica.bulk import BulkFactory
 
 from jamaica.v1.serializers import GlasswareItem
 
@@ -12,18 +15,24 @@ from barbados.serializers import ObjectSerializer
 ns = api.namespace('v1/glassware', description='Glassware.')
 
 
+class GlasswarePayloadCache(PayloadCache):
+    cache_key = 'payload:glassware'
+    cache = GlasswareScanCache
+    model = GlasswareItem
+    generations = [GlasswareGeneration]
+
+
 @ns.route('')
 class GlasswaresEndpoint(Resource):
 
-    @api.response(200, 'success')
-    @api.marshal_list_with(GlasswareItem)
+    @api.response(200, 'success', [GlasswareItem])
+    @generation_etag(GlasswareGeneration)
     def get(self):
         """
         Return a list of all glassware.
         :return: List[Dict]
         """
-        serialized_glassware = GlasswareScanCache.retrieve()
-        return serialized_glassware
+        return GlasswarePayloadCache.response()
 
     @api.response(201, 'created')
     @api.expect(GlasswareItem, validate=True)
@@ -38,6 +47,7 @@ class GlasswaresEndpoint(Resource):
 
         # Invalidate Cache
         GlasswareScanCache.invalidate()
+        GlasswareGeneration.bump()
 
         return ObjectSerializer.serialize(c, 'dict'), 201
 
@@ -47,14 +57,11 @@ class GlasswaresEndpoint(Resource):
         Delete all glassware from the database.
         :return: None
         """
-        serialized_glassware = GlasswareScanCache.retrieve()
-        objs = [GlasswareFactory.raw_to_obj(glassware) for glassware in serialized_glassware]
-        for c in objs:
-            GlasswareFactory.delete_obj(c, commit=False)
+        count = BulkFactory.delete_all(GlasswareFactory)
 
-        current_session.commit()
         GlasswareScanCache.invalidate()
-        return len(objs), 204
+        GlasswareGeneration.bump()
+        return count, 204
 
 
 @ns.route('/<string:slug>')
@@ -62,6 +69,7 @@ class GlasswaresEndpoint(Resource):
 class GlasswareEndpoint(Resource):
 
     @api.response(200, 'success')
+    @generation_etag(GlasswareGeneration)
     def get(self, slug):
         """
         Get a glassware.
@@ -81,4 +89,5 @@ class GlasswareEndpoint(Resource):
         c = GlasswareFactory.produce_obj(id=slug)
         GlasswareFactory.delete_obj(c)
         GlasswareScanCache.invalidate()
+        GlasswareGeneration.bump()
         return None, 204
@@ -1,5 +1,7 @@
 from flask_restx import Resource
 from jamaica.v1.restx import api
+from jamaica.cache.generation import GenerationBase
+from jamaica.bulk import BulkIndexer
 from flask_sqlalchemy_session import current_session
 
 from barbados.indexers import Indexers
@@ -34,6 +36,8 @@ class IndexEndpoint(Resource):
         indexer = Indexers.indexer_for(index)
 
         counter = indexer.reindex(current_session)
+        BulkIndexer.refresh(index)
+        [generation.bump() for generation in GenerationBase.for_indexer(indexer)]
         return counter
 
     @api.response(204, 'successful delete')
@@ -45,5 +49,7 @@ class IndexEndpoint(Resource):
         """
         index = Indexes.get_index(name=name)
         counter = index.delete_all()
+        BulkIndexer.refresh(index)
+        [generation.bump() for generation in GenerationBase.for_indexer(Indexers.indexer_for(index))]
 
         return counter
@@ -3,7 +3,15 @@ from flask_restx import Resource
 from jamaica.v1.restx import api
 from jamaica.v1.ingredients.serializers import IngredientObject, IngredientSearchItem, IngredientSubstitution
 from jamaica.v1.ingredients.parsers import ingredient_list_parser
-from flask_sqlalchemy_session import current_session
+from jamaica.cache.generation import IngredientGeneration, InventoryGeneration
+from jamaica.cache.payload import PayloadCache
+from jamaica.cache.etag import generation_etag
+from jamaica.cache.local import CollectionCacheBase
+from jamaica.v1.parsers import collection_parser
+from jamaica.bulk import BulkFactory, BulkIndexer
+from jamaica.cache.search import SearchCache
+from jamaica.cache.objects import ObjectCache
+from jamaica.resolvers import reindex_inventories
 
 from barbados.search.ingredient import IngredientSearch
 from barbados.caches.ingredienttree import IngredientTreeCache
@@ -11,22 +19,63 @@ from barbados.caches.tablescan import IngredientScanCache
 from barbados.factories.ingredient import IngredientFactory
 from barbados.serializers import ObjectSerializer
 from barbados.indexers.ingredient import IngredientIndexer
+from barbados.indexes.ingredient import IngredientIndex
 
 ns = api.namespace('v1/ingredients', description='Ingredient database.')
 
+ingredient_search = SearchCache(name='ingredients', search=IngredientSearch, model=IngredientSearchItem,
+                                generation=IngredientGeneration)
+
+
+class IngredientPayloadCache(PayloadCache):
+    cache_key = 'payload:ingredients'
+    cache = IngredientScanCache
+    model = IngredientObject
+    generations = [IngredientGeneration]
+
+
+class IngredientTreePayloadCache(PayloadCache):
+    cache_key = 'payload:ingredient-tree'
+    cache = IngredientTreeCache
+    generations = [IngredientGeneration]
+
+    @classmethod
+    def data(cls):
+        return json.loads(cls.cache.retrieve().to_json())
+
+
+class IngredientObjectCache(ObjectCache):
+    cache_key = 'ingredients'
+    factory = IngredientFactory
+    model = IngredientObject
+    object_generations = [IngredientGeneration]
+
+
+class IngredientCollectionCache(CollectionCacheBase):
+    cache = IngredientScanCache
+    model = IngredientObject
+    generations = [IngredientGeneration]
+
 
 @ns.route('')
 class IngredientsEndpoint(Resource):
 
-    @api.response(200, 'success')
-    @api.marshal_list_with(IngredientObject)
+    @api.response(200, 'success', [IngredientObject])
+    @api.expect(collection_parser, validate=True)
+    @generation_etag(IngredientGeneration)
     def get(self):
         """
         List all ingredients
+        Use after, limit and fields to get a page or only part of each object.
         :return: List of Ingredient dicts
         """
-        serialized_ingredients = IngredientScanCache.retrieve()
-        return serialized_ingredients
+        args = collection_parser.parse_args(strict=True)
+
+        # The whole thing is already serialized and compressed.
+        if all(value is None for value in args.values()):
+            return IngredientPayloadCache.response()
+
+        return IngredientCollectionCache.response(**args)
 
     @api.response(201, 'created')
     @api.expect(IngredientObject, validate=True)
@@ -40,10 +89,16 @@ class IngredientsEndpoint(Resource):
         i.refresh()
         IngredientFactory.insert_obj(obj=i)
         IngredientIndexer.index(i)
+        BulkIndexer.refresh(IngredientIndex)
 
         # Invalidate cache
         IngredientScanCache.invalidate()
         IngredientTreeCache.invalidate()
+        IngredientGeneration.bump()
+        IngredientObjectCache.invalidate(i.slug)
+
+        # Indexed inventories hold their expansion against the tree.
+        reindex_inventories(slugs={i.slug})
 
         return ObjectSerializer.serialize(i, 'dict'), 201
 
@@ -53,62 +108,63 @@ class IngredientsEndpoint(Resource):
         Delete all ingredients from the database. There be dragons here.
         :return: Number of items deleted.
         """
-        objects = IngredientFactory.produce_all_objs()
-        for i in objects:
-            IngredientFactory.delete_obj(obj=i, commit=False)
+        count = BulkFactory.delete_all(IngredientFactory)
 
         IngredientIndexer.empty()
-
-        current_session.commit()
+        BulkIndexer.refresh(IngredientIndex)
         IngredientScanCache.invalidate()
         IngredientTreeCache.invalidate()
+        # Moves every ingredient at once, so the object cache drops them all.
+        IngredientGeneration.bump_all()
 
-        return len(objects), 204
+        # Every inventory expands differently now. That is too many to re-index
+        # here, so reindex the inventory index once the new ingredients are in.
+        InventoryGeneration.bump_all()
+
+        return count, 204
 
 
 @ns.route('/search')
 class IngredientSearchEndpoint(Resource):
 
-    @api.response(200, 'success')
+    @api.response(200, 'success', [IngredientSearchItem])
     @api.expect(ingredient_list_parser, validate=True)
-    @api.marshal_list_with(IngredientSearchItem)
     def get(self):
         """
         Lookup ingredients in search.
         :return: List of search result Dicts
         """
         args = ingredient_list_parser.parse_args(strict=True)
-        return IngredientSearch(**args).execute()
+        return ingredient_search.execute(**args)
 
 
 @ns.route('/tree')
 class IngredientTreeEndpoint(Resource):
 
     @api.response(200, 'success')
+    @generation_etag(IngredientGeneration)
     def get(self):
         """
         Get the entire ingredient tree from cache. No marshaling model
         is documented due to recursion problems.
         :return: Dict
         """
-        ingredient_tree = IngredientTreeCache.retrieve()
-        return json.loads(ingredient_tree.to_json())
+        return IngredientTreePayloadCache.response()
 
 
 @ns.route('/<string:slug>')
 @api.doc(params={'slug': 'An ingredient slug.'})
 class IngredientEndpoint(Resource):
 
-    @api.response(200, 'success')
-    @api.marshal_with(IngredientObject)
+    @api.response(200, 'success', IngredientObject)
+    @generation_etag(IngredientGeneration)
     def get(self, slug):
         """
         Get a single ingredient from the database.
         :param slug:
         :return: Serialized Ingredient
         """
-        c = IngredientFactory.produce_obj(id=slug)
-        return ObjectSerializer.serialize(c, 'dict')
+        return IngredientObjectCache.response(slug)
 
     @api.response(204, 'successful delete')
     def delete(self, slug):
@@ -118,12 +174,19 @@ class IngredientEndpoint(Resource):
         :return:
         """
         i = IngredientFactory.produce_obj(id=slug)
+        tree = IngredientTreeCache.retrieve()
         IngredientFactory.delete_obj(obj=i)
+        IngredientIndexer.delete(i)
+        BulkIndexer.refresh(IngredientIndex)
 
-        # Invalidate caches and de-index.
+        # Invalidate caches.
         IngredientScanCache.invalidate()
         IngredientTreeCache.invalidate()
-        IngredientIndexer.delete(i)
+        IngredientGeneration.bump()
+        IngredientObjectCache.invalidate(slug)
+
+        # Indexed inventories hold their expansion against the tree, including where this used to be.
+        reindex_inventories(slugs={slug}, trees=[tree])
 
         return None, 204
 
@@ -132,6 +195,7 @@ class IngredientEndpoint(Resource):
 class IngredientSubtreeEndpoint(Resource):
 
     @api.response(200, 'success')
+    @generation_etag(IngredientGeneration)
     def get(self, slug):
         """
         Return the subtree of this ingredient from the main tree.
@@ -147,6 +211,7 @@ class IngredientSubtreeEndpoint(Resource):
 class IngredientSubstitutionEndpoint(Resource):
 
     @api.response(200, 'success')
+    @generation_etag(IngredientGeneration)
     @api.marshal_with(IngredientSubstitution)
     def get(self, slug):
         """
@@ -172,6 +237,12 @@ class IngredientRefreshEndpoint(Resource):
         i.refresh()
         IngredientFactory.update_obj(obj=i, id_value=slug)
         IngredientIndexer.index(i)
+        BulkIndexer.refresh(IngredientIndex)
 
         # Invalidate cache
         IngredientScanCache.invalidate()
+        IngredientGeneration.bump()
+        IngredientObjectCache.invalidate(slug)
+
+        # Indexed inventories hold their expansion against the tree.
+        reindex_inventories(slugs={slug})
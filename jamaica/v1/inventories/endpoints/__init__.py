@@ -1,10 +1,23 @@
-from flask_restx import Resource
-from jamaica.cache import flask_cache
-from jamaica.v1.restx import api
+import json
+from flask import Response, request, stream_with_context
+from flask_restx import Resource, marshal
+from jamaica.v1.restx import api, ErrorModel
+from jamaica.v1.serializers import JobObject
 from jamaica.v1.inventories.serializers import InventoryObject
-from jamaica.v1.inventories.parsers import inventory_recipes_parser
-from jamaica.v1.inventories.serializers import InventoryResolutionSummaryObject, InventoryItemObject
-from flask_sqlalchemy_session import current_session
+from jamaica.v1.inventories.parsers import inventory_recipes_parser, inventory_summary_parser, inventory_purchase_parser, \
+    inventory_batch_parser, inventory_stream_parser
+from jamaica.v1.inventories.serializers import InventoryResolutionSummaryObject, InventoryItemObject, InventoryPurchaseObject, \
+    InventoryBatchRequestObject, InventoryBatchObject
+from jamaica.resolvers import BatchRecipeResolver, ResolutionManifest, InventoryItemResolver, resolve_inventory_recipes, \
+    resolve_inventories_recipes, iter_inventory_recipes
+from jamaica.resolvers.matrix import RecipeMatrixCache, Status
+from jamaica.resolvers.purchase import PurchaseOptimizer
+from jamaica.bulk import BulkFactory, BulkIndexer
+from jamaica.jobs import job_runner, JobStatus
+from jamaica.cache.generation import InventoryGeneration
+from jamaica.cache.payload import PayloadCache
+from jamaica.cache.etag import generation_etag
+from jamaica.cache.versioned import InventoryRecipesCache, InventoryFullCache
 
 from barbados.factories.inventory import InventoryFactory
 from barbados.factories.cocktail import CocktailFactory
@@ -12,28 +25,35 @@ from barbados.factories.reciperesolution import RecipeResolutionFactory
 from barbados.serializers import ObjectSerializer
 from barbados.caches.tablescan import InventoryScanCache
 from barbados.resolvers.recipe import RecipeResolver
-from barbados.caches.tablescan import CocktailScanCache
 from barbados.search.reciperesolution import RecipeResolutionSearch
 from barbados.indexers.reciperesolution import RecipeResolutionIndexer
+from barbados.indexes.reciperesolution import RecipeResolutionIndex
 from barbados.indexers.inventory import InventoryIndexer
 from barbados.reports.inventory import InventoryReport
+from barbados.exceptions import ValidationException
 
 
 ns = api.namespace('v1/inventories', description='Inventories.')
 
 
+class InventoryPayloadCache(PayloadCache):
+    cache_key = 'payload:inventories'
+    cache = InventoryScanCache
+    model = InventoryObject
+    generations = [InventoryGeneration]
+
+
 @ns.route('')
 class InventoriesEndpoint(Resource):
 
-    @api.response(200, 'success')
-    @api.marshal_list_with(InventoryObject)
+    @api.response(200, 'success', [InventoryObject])
+    @generation_etag(InventoryGeneration)
     def get(self):
         """
         List all Inventories
         :return: List of Inventory dicts
         """
-        serialized_objects = InventoryScanCache.retrieve()
-        return serialized_objects
+        return InventoryPayloadCache.response()
 
     @api.response(201, 'created')
     @api.expect(InventoryObject, validate=True)
@@ -49,11 +69,13 @@ class InventoriesEndpoint(Resource):
         i = InventoryFactory.raw_to_obj(api.payload)
         InventoryFactory.insert_obj(obj=i)
 
-        # Index
-        InventoryIndexer.index(i)
+        # Index the expanded form so that reads never have to.
+        InventoryIndexer.index(InventoryFactory.produce_obj(id=i.id, expand=True))
 
         # Invalidate Cache
         InventoryScanCache.invalidate()
+        InventoryGeneration.bump()
+        InventoryGeneration.bump(i.id)
 
         return ObjectSerializer.serialize(i, 'dict'), 201
 
@@ -63,17 +85,66 @@ class InventoriesEndpoint(Resource):
         Delete all objects from the database. There be dragons here.
         :return: Number of items deleted.
         """
-
-        objects = InventoryFactory.produce_all_objs()
-        for i in objects:
-            InventoryFactory.delete_obj(obj=i, commit=False)
-
-        current_session.commit()
+        count = BulkFactory.delete_all(InventoryFactory)
 
         InventoryIndexer.empty()
         InventoryScanCache.invalidate()
+        # Takes every inventory and manifest with it.
+        InventoryGeneration.bump_all()
+
+        return count, 204
+
+
+@ns.route('/recipes')
+class InventoriesRecipesEndpoint(Resource):
+
+    @api.response(200, 'success')
+    @api.expect(InventoryBatchRequestObject, inventory_batch_parser, validate=True)
+    @api.marshal_with(InventoryBatchObject)
+    def post(self):
+        """
+        Resolve and save the recipes of many inventories (or all of them)
+        in one pass, sharing the corpus and ingredient tree between them.
+        :return: Results per inventory and throughput stats.
+        :raises KeyError: not found
+        :raises ValidationException: no JSON object in the body.
+        """
+        args = inventory_batch_parser.parse_args()
+
+        if not isinstance(api.payload, dict):
+            raise ValidationException("Expected a JSON object, e.g. {} to resolve every inventory.")
+
+        ids = api.payload.get('inventories')
+        if ids is None:
+            inventories = InventoryFactory.produce_all_objs()
+        else:
+            inventories = [InventoryFactory.produce_obj(id=id) for id in ids]
+
+        results, stats = resolve_inventories_recipes(inventories=inventories)
+        if not args.get('results'):
+            results = {}
+
+        return {'stats': stats, 'results': results}
+
+
+@ns.route('/recipes/preview')
+class InventoryPreviewRecipesEndpoint(Resource):
+
+    @api.response(200, 'success')
+    @api.expect(InventoryObject, validate=True)
+    @api.marshal_list_with(InventoryResolutionSummaryObject)
+    def post(self):
+        """
+        Resolve an inventory that has not been saved against every spec in
+        the corpus. Nothing is saved or indexed, so this is a read-only way
+        to ask "what can I make with this?".
+        :return: List of resolution summaries.
+        """
+        api.payload.pop('id', None)
+        i = InventoryFactory.raw_to_obj(api.payload)
 
-        return len(objects), 204
+        results = BatchRecipeResolver.resolve(inventory=i)
+        return [ObjectSerializer.serialize(rs, 'dict') for rs in results]
 
 
 @ns.route('/<uuid:id>')
@@ -81,6 +152,7 @@ class InventoriesEndpoint(Resource):
 class InventoryEndpoint(Resource):
 
     @api.response(200, 'success')
+    @generation_etag(InventoryGeneration, id_arg='id')
     @api.marshal_with(InventoryObject)
     def get(self, id):
         """
@@ -105,7 +177,10 @@ class InventoryEndpoint(Resource):
 
         # Invalidate Cache
         InventoryScanCache.invalidate()
+        InventoryGeneration.bump()
         InventoryIndexer.delete(i)
+        ResolutionManifest.invalidate(id)
+        InventoryGeneration.bump(id)
 
         return None, 204
 
@@ -119,14 +194,13 @@ class InventoryFullEndpoint(Resource):
     def get(self, id):
         """
         Return a fully-expanded inventory including the implicitly
-        included items.
+        included items. This is cached until either the inventory or the
+        ingredient tree changes.
         :param id: GUID of the object.
         :return: Serialized Object
         :raises KeyError: not found
         """
-        i = InventoryFactory.produce_obj(id=id, expand=True)
-        InventoryIndexer.index(i)
-        return ObjectSerializer.serialize(i, 'dict')
+        return InventoryFullCache.retrieve(id)
 
 
 @ns.route('/<uuid:id>/items/<string:slug>')
@@ -140,18 +214,19 @@ class InventoryItemsEndpoint(Resource):
     @api.marshal_with(InventoryItemObject)
     def get(self, id, slug):
         """
-        Return a single inventory item.
+        Return a single inventory item, whether it is in the inventory
+        explicitly or implicitly.
         :param id: GUID of the inventory.
         :param slug: Slug of the item.
         :return: InventoryItem
         """
-        i = InventoryFactory.produce_obj(id=id, expand=True)
-        ii = i.items.get(slug)
+        i = InventoryFactory.produce_obj(id=id)
+        ii = InventoryItemResolver.resolve(inventory=i, slug=slug)
 
         if not ii:
             raise KeyError("Item %s not found in inventory %s." % (slug, id))
 
-        return ObjectSerializer.serialize(ii, 'dict')
+        return ii
 
 
 @ns.route('/<uuid:id>/recipes/<string:cocktail_slug>')
@@ -175,59 +250,75 @@ class InventoryRecipeEndpoint(Resource):
         results = RecipeResolver.resolve(inventory=i, cocktail=c, spec_slug=spec_slug)
 
         # Save the things we got.
-        [RecipeResolutionFactory.insert_obj(rs, overwrite=True) for rs in results]
-        [RecipeResolutionIndexer.index(rs) for rs in results]
+        BulkFactory.upsert_objs(RecipeResolutionFactory, results)
+        BulkIndexer.index(RecipeResolutionIndexer, results)
 
         return [ObjectSerializer.serialize(rs, 'dict') for rs in results]
 
     @api.response(204, 'successful delete')
     def delete(self, id, cocktail_slug, spec_slug=None):
         """
-        :param id:
+        Delete the stored recipe resolutions of a cocktail (or one of its
+        specs) for this inventory.
+        :param id: Inventory ID UUID
         :param cocktail_slug:
         :param spec_slug:
-        :return:
+        :return: Count of deletions.
         """
-        i = InventoryFactory.produce_obj(id=id)
-
-        c = CocktailFactory.produce_obj(id=cocktail_slug)
-        results = RecipeResolver.resolve(inventory=i, cocktail=c, spec_slug=spec_slug)
+        fields = {'inventory_id': id, 'cocktail_slug': cocktail_slug}
+        if spec_slug:
+            fields['spec_slug'] = spec_slug
 
-        # Drop
-        for rs in results:
-            RecipeResolutionFactory.delete_obj(rs, commit=False)
-            RecipeResolutionIndexer.delete(rs)
-        current_session.commit()
+        count = BulkFactory.delete_by(RecipeResolutionFactory, **fields)
+        BulkIndexer.delete_by(RecipeResolutionIndex, **fields)
+        ResolutionManifest.invalidate(id)
+        InventoryGeneration.bump(id)
 
-        return len(results), 204
+        return count, 204
 
 
 @ns.route('/<uuid:id>/recipes')
 @api.doc(params={'id': 'Inventory ID object.'})
 class InventoryRecipesEndpoint(Resource):
 
-    @api.response(200, 'success')
-    @api.marshal_list_with(InventoryResolutionSummaryObject)
-    # @flask_cache.cached()
+    @api.response(200, 'success', [InventoryResolutionSummaryObject])
+    @api.expect(inventory_stream_parser)
     def get(self, id):
         """
+        Resolve this inventory against every spec in the corpus. Ask for
+        application/x-ndjson (or ?stream=true) to get one result per line
+        as soon as it is resolved instead of the whole list at the end.
         :param id:
         :return:
         """
-        i = InventoryFactory.produce_obj(id=id)
+        args = inventory_stream_parser.parse_args()
+        ndjson = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
 
-        results = []
-        cocktails_cache = CocktailScanCache.retrieve()
-        for raw_c in cocktails_cache:
-            c = CocktailFactory.produce_obj(id=raw_c.get('slug'))
-            c_results = RecipeResolver.resolve(inventory=i, cocktail=c)
-            results += c_results
+        if args.get('stream') or ndjson:
+            i = InventoryFactory.produce_obj(id=id)
 
-        # Save the things we got.
-        [RecipeResolutionFactory.insert_obj(rs, overwrite=True) for rs in results]
-        [RecipeResolutionIndexer.index(rs) for rs in results]
+            def generate():
+                for result in iter_inventory_recipes(i=i):
+                    yield json.dumps(marshal(result, InventoryResolutionSummaryObject)) + '\n'
 
-        return [ObjectSerializer.serialize(rs, 'dict') for rs in results]
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        return marshal(InventoryRecipesCache.retrieve(id), InventoryResolutionSummaryObject)
+
+    @api.response(202, 'accepted')
+    @api.marshal_with(JobObject, code=202)
+    def post(self, id):
+        """
+        Resolve this inventory in the background. Poll the job for progress
+        and fetch the results from it once it has succeeded.
+        :param id: Inventory ID UUID
+        :return: Job
+        :raises KeyError: not found
+        """
+        InventoryFactory.produce_obj(id=id)
+
+        job = job_runner.submit(resolve_inventory_recipes, description="Resolve recipes for inventory %s" % id, id=id)
+        return job, 202
 
     @api.response(204, 'successful delete')
     def delete(self, id):
@@ -236,13 +327,74 @@ class InventoryRecipesEndpoint(Resource):
         :param id: Inventory ID UUID
         :return: Count of deletions.
         """
-        results = RecipeResolutionFactory.produce_all_objs_from_inventory(inventory_id=id)
-        for rs in results:
-            RecipeResolutionFactory.delete_obj(rs, commit=False)
-            RecipeResolutionIndexer.delete(rs)
-        current_session.commit()
+        count = BulkFactory.delete_by(RecipeResolutionFactory, inventory_id=id)
+        BulkIndexer.delete_by(RecipeResolutionIndex, inventory_id=id)
+        ResolutionManifest.invalidate(id)
+        InventoryGeneration.bump(id)
+
+        return count, 200
 
-        return len(results), 200
+
+@ns.route('/jobs/<uuid:job_id>')
+@api.doc(params={'job_id': 'A job ID.'})
+class InventoryJobEndpoint(Resource):
+
+    @api.response(200, 'success')
+    @api.marshal_with(JobObject)
+    def get(self, job_id):
+        """
+        Get the status and progress of a job.
+        :param job_id: GUID of the job.
+        :return: Job
+        :raises KeyError: not found
+        """
+        return job_runner.get(job_id)
+
+
+@ns.route('/jobs/<uuid:job_id>/result')
+@api.doc(params={'job_id': 'A job ID.'})
+class InventoryJobResultEndpoint(Resource):
+
+    @api.response(200, 'success', [InventoryResolutionSummaryObject])
+    @api.response(409, 'job has not succeeded', ErrorModel)
+    def get(self, job_id):
+        """
+        Get the results of a job.
+        :param job_id: GUID of the job.
+        :return: List of results.
+        :raises KeyError: not found
+        """
+        job = job_runner.get(job_id)
+        if job.status != JobStatus.SUCCEEDED:
+            return {'message': "Job %s is %s." % (job.id, job.status), 'details': job.error}, 409
+
+        return marshal(job.result, InventoryResolutionSummaryObject)
+
+
+@ns.route('/<uuid:id>/recipes/summary')
+@api.doc(params={'id': 'Inventory ID object.'})
+class InventoryRecipesSummaryEndpoint(Resource):
+
+    @api.response(200, 'success')
+    @api.expect(inventory_summary_parser, validate=True)
+    @api.marshal_list_with(InventoryResolutionSummaryObject)
+    def get(self, id):
+        """
+        Count how every spec in the corpus resolves against this inventory
+        using the RecipeMatrix. Only the counts are filled in, not the
+        individual components. Nothing is saved.
+        :param id: Inventory ID UUID
+        :return: List of summaries.
+        :raises KeyError: not found
+        """
+        args = inventory_summary_parser.parse_args(strict=True)
+        i = InventoryFactory.produce_obj(id=id)
+
+        results = RecipeMatrixCache.retrieve().summarize({i.id: i.items.keys()})[i.id]
+        if args.get('missing') is not None:
+            results = [result for result in results if result['status_count'][Status.MISSING] <= args.get('missing')]
+
+        return results
 
 
 @ns.route('/<uuid:id>/recipes/search')
@@ -269,3 +421,25 @@ class InventoryReportEndpoint(Resource):
         i = InventoryFactory.produce_obj(id=id)
         r = InventoryReport(inventory=i)
         return r.run()
+
+
+@ns.route('/<uuid:id>/purchases')
+@api.doc(params={'id': 'An object ID.'})
+class InventoryPurchasesEndpoint(Resource):
+
+    @api.response(200, 'success')
+    @api.expect(inventory_purchase_parser, validate=True)
+    @api.marshal_list_with(InventoryPurchaseObject)
+    def get(self, id):
+        """
+        Recommend the ingredients to add to this inventory that make the
+        most additional specs makeable, and which specs each one unlocks.
+        :param id: GUID of the inventory.
+        :return: List of recommendations in order of preference.
+        :raises KeyError: not found
+        """
+        args = inventory_purchase_parser.parse_args(strict=True)
+        i = InventoryFactory.produce_obj(id=id)
+
+        optimizer = PurchaseOptimizer(RecipeMatrixCache.retrieve())
+        return optimizer.optimize(items=i.items.keys(), count=args.get('count'), candidates=PurchaseOptimizer.candidates())
@@ -1,5 +1,5 @@
 import copy
-from flask_restx import reqparse
+from flask_restx import reqparse, inputs
 from jamaica.v1.cocktails.parsers import cocktail_list_parser
 
 inventory_resolve_parser = reqparse.RequestParser()
@@ -11,3 +11,17 @@ inventory_resolve_parser.add_argument('spec', type=str, help='spec slug from the
 inventory_recipes_parser = copy.deepcopy(cocktail_list_parser)
 inventory_recipes_parser.add_argument('missing', type=str, help='Count of missing')
 inventory_recipes_parser.remove_argument('instructions')
+inventory_recipes_parser.remove_argument('hierarchy')
+
+inventory_summary_parser = reqparse.RequestParser()
+inventory_summary_parser.add_argument('missing', type=int, help='Only include specs missing at most this many components.')
+
+inventory_purchase_parser = reqparse.RequestParser()
+inventory_purchase_parser.add_argument('count', type=int, default=5, help='Number of ingredients to recommend.')
+
+inventory_stream_parser = reqparse.RequestParser()
+inventory_stream_parser.add_argument('stream', type=inputs.boolean, default=False,
+                                     help='Stream results as newline-delimited JSON. Same as Accept: application/x-ndjson.')
+
+inventory_batch_parser = reqparse.RequestParser()
+inventory_batch_parser.add_argument('results', type=inputs.boolean, default=True, help='Include the results and not just the stats.')
@@ -50,3 +50,40 @@ InventoryResolutionSummaryObject = api.model('InventoryResolutionSummaryObject',
     'garnish': fields.List(fields.Nested(ComponentItem), attribute='garnish'),
     'generated_at': fields.String(attribute='generated_at')
 })
+
+InventoryPurchaseUnlockObject = api.model('InventoryPurchaseUnlockObject', {
+    'cocktail_slug': fields.String(attribute='cocktail_slug', example='daiquiri'),
+    'spec_slug': fields.String(attribute='spec_slug', example='death-co'),
+})
+
+InventoryPurchaseObject = api.model('InventoryPurchaseObject', {
+    'slug': fields.String(attribute='slug', description='Slug of the ingredient to add.', example='lime-juice'),
+    'unlocks': fields.List(fields.Nested(InventoryPurchaseUnlockObject), attribute='unlocks',
+                           description='Specs that become makeable once this ingredient is added.')
+})
+
+InventoryBatchRequestObject = api.model('InventoryBatchRequestObject', {
+    'inventories': fields.List(fields.String(description='Inventory ID.'), attribute='inventories', required=False,
+                               description='IDs of the inventories to resolve. Omit to resolve all of them.')
+})
+
+InventoryBatchStatsObject = api.model('InventoryBatchStatsObject', {
+    'inventories': fields.Integer(attribute='inventories', description='Number of inventories resolved.'),
+    'resolutions': fields.Integer(attribute='resolutions', description='Number of spec resolutions across all inventories.'),
+    'resolved': fields.Integer(attribute='resolved', description='Number of spec resolutions that had to be recomputed.'),
+    'seconds': fields.Float(attribute='seconds', description='Wall time of the whole batch.'),
+    'inventories_per_second': fields.Float(attribute='inventories_per_second'),
+    'resolutions_per_second': fields.Float(attribute='resolutions_per_second'),
+})
+
+# Same deal as InventoryItems above.
+InventoryBatchResultsWildcard = fields.Wildcard(fields.List(fields.Nested(InventoryResolutionSummaryObject)),
+                                                description='List of InventoryResolutionSummaryObjects per inventory ID')
+InventoryBatchResults = api.model('InventoryBatchResults', {
+    '*': InventoryBatchResultsWildcard
+})
+
+InventoryBatchObject = api.model('InventoryBatchObject', {
+    'stats': fields.Nested(InventoryBatchStatsObject, attribute='stats'),
+    'results': fields.Nested(InventoryBatchResults, attribute='results'),
+})
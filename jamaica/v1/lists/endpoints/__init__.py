@@ -1,31 +1,45 @@
 from flask_restx import Resource
 from jamaica.v1.restx import api
+from jamaica.cache.generation import ListGeneration
+from jamaica.cache.payload import PayloadCache
+from jamaica.bulk import BulkFactory, BulkIndexer
+from jamaica.cache.search import SearchCache
+from jamaica.cache.etag import generation_etag
 from jamaica.v1.lists.serializers import ListObject, ListSearchItem, ListItemObject
 from jamaica.v1.lists.parsers import list_parser
-from flask_sqlalchemy_session import current_session
 
 from barbados.factories.list import ListFactory
 from barbados.factories.listitem import ListItemFactory
 from barbados.serializers import ObjectSerializer
 from barbados.caches.tablescan import ListScanCache
 from barbados.indexers.list import ListIndexer
+from barbados.indexes.list import ListIndex
 from barbados.search.lists import ListsSearch
 from barbados.exceptions import FactoryUpdateException
 
 ns = api.namespace('v1/lists', description='Lists.')
 
+list_search = SearchCache(name='lists', search=ListsSearch, model=ListSearchItem, generation=ListGeneration)
+
+
+class ListPayloadCache(PayloadCache):
+    cache_key = 'payload:lists'
+    cache = ListScanCache
+    model = ListObject
+    generations = [ListGeneration]
+
 
 @ns.route('')
 class ListsEndpoint(Resource):
 
-    @api.response(200, 'success')
-    @api.marshal_list_with(ListObject)
+    @api.response(200, 'success', [ListObject])
+    @generation_etag(ListGeneration)
     def get(self):
         """
         List all Lists
         :return: List of List dicts
         """
-        return ListScanCache.retrieve()
+        return ListPayloadCache.response()
 
     @api.response(201, 'created')
     @api.expect(ListObject, validate=True)
@@ -38,9 +52,11 @@ class ListsEndpoint(Resource):
         m = ListFactory.raw_to_obj(api.payload)
         ListFactory.insert_obj(obj=m)
         ListIndexer.index(m)
+        BulkIndexer.refresh(ListIndex)
 
         # Invalidate Cache
         ListScanCache.invalidate()
+        ListGeneration.bump()
 
         return ObjectSerializer.serialize(m, 'dict'), 201
 
@@ -50,30 +66,28 @@ class ListsEndpoint(Resource):
         Delete all Lists from the database. There be dragons here.
         :return: Number of items deleted.
         """
-        objects = ListFactory.produce_all_objs()
-        for m in objects:
-            ListFactory.delete_obj(obj=m, commit=False)
+        count = BulkFactory.delete_all(ListFactory)
 
         ListIndexer.empty()
-        current_session.commit()
+        BulkIndexer.refresh(ListIndex)
         ListScanCache.invalidate()
+        ListGeneration.bump()
 
-        return len(objects), 204
+        return count, 204
 
 
 @ns.route('/search')
 class ListSearchEndpoint(Resource):
 
-    @api.response(200, 'success')
+    @api.response(200, 'success', [ListSearchItem])
     @api.expect(list_parser, validate=True)
-    @api.marshal_list_with(ListSearchItem)
     def get(self):
         """
         Search a List.
         :return: List of search result Dicts
         """
         args = list_parser.parse_args(strict=True)
-        return ListsSearch(**args).execute()
+        return list_search.execute(**args)
 
 
 @ns.route('/<uuid:id>')
@@ -81,6 +95,7 @@ class ListSearchEndpoint(Resource):
 class ListEndpoint(Resource):
 
     @api.response(200, 'success')
+    @generation_etag(ListGeneration)
     @api.marshal_with(ListObject)
     def get(self, id):
         """
@@ -100,10 +115,12 @@ class ListEndpoint(Resource):
         """
         m = ListFactory.produce_obj(id=id)
         ListFactory.delete_obj(obj=m)
+        ListIndexer.delete(m)
+        BulkIndexer.refresh(ListIndex)
 
-        # Invalidate Cache and de-index.
+        # Invalidate Cache
         ListScanCache.invalidate()
-        ListIndexer.delete(m)
+        ListGeneration.bump()
 
         return None, 204
 
@@ -113,6 +130,7 @@ class ListEndpoint(Resource):
 class ListItemsEndpoint(Resource):
 
     @api.response(200, 'success')
+    @generation_etag(ListGeneration)
     @api.marshal_list_with(ListItemObject)
     def get(self, id):
         """
@@ -137,9 +155,11 @@ class ListItemsEndpoint(Resource):
         lst.add_item(i)
         ListFactory.update_obj(obj=lst, id_attr='id')
         ListIndexer.index(lst)
+        BulkIndexer.refresh(ListIndex)
 
         # Invalidate Cache
         ListScanCache.invalidate()
+        ListGeneration.bump()
 
         return ObjectSerializer.serialize(i, 'dict')
 
@@ -149,6 +169,7 @@ class ListItemsEndpoint(Resource):
 class ListItemsItemEndpoint(Resource):
 
     @api.response(200, 'success')
+    @generation_etag(ListGeneration)
     @api.marshal_with(ListItemObject)
     def get(self, id, slug):
         """
@@ -180,9 +201,11 @@ class ListItemsItemEndpoint(Resource):
         lst.replace_item(i)
         ListFactory.update_obj(obj=lst, id_attr='id', id_value=id)
         ListIndexer.index(lst)
+        BulkIndexer.refresh(ListIndex)
 
         # Invalidate Cache
         ListScanCache.invalidate()
+        ListGeneration.bump()
 
         return ObjectSerializer.serialize(i, 'dict'), 201
 
@@ -199,8 +222,10 @@ class ListItemsItemEndpoint(Resource):
         lst.remove_item(slug)
         ListFactory.update_obj(obj=lst, id_attr='id', id_value=lst.id)
         ListIndexer.index(lst)
+        BulkIndexer.refresh(ListIndex)
 
         # Invalidate Cache
         ListScanCache.invalidate()
+        ListGeneration.bump()
 
         return None, 204
@@ -4,3 +4,9 @@ from jamaica.settings import cognito_settings
 auth_parser = reqparse.RequestParser()
 auth_parser.add_argument(cognito_settings.get('COGNITO_JWT_HEADER_NAME'), type=str, location='headers',
                          help="API token with usage prefix. Example: \"Bearer abc123l0l\"")
+
+collection_parser = reqparse.RequestParser()
+collection_parser.add_argument('after', type=str, help='Slug to start after. Use the cursor from the previous page.')
+collection_parser.add_argument('limit', type=inputs.positive, help='Maximum number of objects per page.')
+collection_parser.add_argument('fields', type=str, action='split',
+                               help='Comma-separated list of fields to include. Use dots for nested fields, e.g. specs.components.slug.')
@@ -49,3 +49,15 @@ ConstructionItem = api.inherit('ConstructionItem', DisplayItemBase, {
 })
 
 GlasswareItem = api.inherit('GlasswareItem', DisplayItemBase, {})
+
+JobObject = api.model('JobObject', {
+    'id': fields.String(attribute='id', description='ID of this job.'),
+    'description': fields.String(attribute='description', description='What this job is doing.'),
+    'status': fields.String(attribute='status', description='Status of this job.', example='running'),
+    'completed': fields.Integer(attribute='completed', description='Units of work done so far.', example=42),
+    'total': fields.Integer(attribute='total', description='Units of work overall, once known.', example=250),
+    'error': fields.String(attribute='error', description='Error message if the job failed.'),
+    'created_at': fields.String(attribute='created_at', description='UTC timestamp of submission.'),
+    'started_at': fields.String(attribute='started_at', description='UTC timestamp of when work started.'),
+    'finished_at': fields.String(attribute='finished_at', description='UTC timestamp of when work finished.'),
+})
@@ -2,6 +2,7 @@ import os
 import requests
 from flask_restx import Resource
 from jamaica.v1.restx import api
+from jamaica.cache.generation import GenerationBase
 
 
 from barbados.services.database import DatabaseService
@@ -30,6 +31,7 @@ class SetupEndpoint(Resource):
 
         # Clear all caches.
         Caches.init()
+        [generation.bump_all() for generation in GenerationBase.__subclasses__()]
 
         # Return something so we know it worked.
         return {'message': 'ok'}
@@ -0,0 +1,23 @@
+from flask_restx import Resource
+from jamaica.v1.restx import api
+from jamaica.v1.typeahead.serializers import TypeaheadItem
+from jamaica.v1.typeahead.parsers import typeahead_parser
+from jamaica.search.typeahead import typeahead
+
+ns = api.namespace('v1/typeahead', description='Name completion.')
+
+
+@ns.route('')
+class TypeaheadEndpoint(Resource):
+
+    @api.response(200, 'success')
+    @api.expect(typeahead_parser, validate=True)
+    @api.marshal_list_with(TypeaheadItem)
+    def get(self):
+        """
+        Complete a cocktail, spec, or ingredient name as it is typed. This
+        never touches the search backend, so call it on every keystroke.
+        :return: List of TypeaheadItem, best first.
+        """
+        args = typeahead_parser.parse_args(strict=True)
+        return typeahead(query=args.get('q'), kinds=args.get('kinds'), limit=args.get('limit'))
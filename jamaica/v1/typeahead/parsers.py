@@ -0,0 +1,7 @@
+from flask_restx import reqparse, inputs
+
+typeahead_parser = reqparse.RequestParser()
+typeahead_parser.add_argument('q', type=str, required=True, help='What has been typed so far.')
+typeahead_parser.add_argument('kinds', type=str, action='split', choices=('cocktail', 'spec', 'ingredient'),
+                              help='Comma-separated list of kinds (cocktail, spec, ingredient) to look for. Defaults to all of them.')
+typeahead_parser.add_argument('limit', type=inputs.int_range(1, 25), default=10, help='Maximum number of results.')
@@ -0,0 +1,12 @@
+from flask_restx import fields
+from jamaica.v1.restx import api
+
+
+TypeaheadItem = api.model('TypeaheadItem', {
+    'kind': fields.String(attribute='kind', description='The kind of this item (cocktail, spec, ingredient).'),
+    'slug': fields.String(attribute='slug', description='This items slug.'),
+    'display_name': fields.String(attribute='display_name', description='This items display name.'),
+    'cocktail_slug': fields.String(attribute='cocktail_slug', description='Slug of the cocktail (only for cocktails and specs).'),
+    'spec_slug': fields.String(attribute='spec_slug', description='Slug of the spec (only for specs).'),
+    'distance': fields.Integer(attribute='distance', description='Number of typos corrected to match this item.'),
+})
@@ -16,7 +16,9 @@ setup(
         'flask_uuid',
         'flask_caching',
         'flask',
-        'flask_cognito'
+        'flask_cognito',
+        'numpy',
+        'brotli'
     ],
     test_requires=[
         'pytest'
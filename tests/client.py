@@ -5,6 +5,7 @@ from jamaica import app
 
 with app.app.app_context():
     app.initialize_endpoints(app.app)
+    app.setup_cache(app.app)
 
 
 @pytest.fixture()
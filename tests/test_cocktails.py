@@ -1,6 +1,9 @@
 import json
+from flask_restx import marshal
 from .client import client
+from jamaica.v1.serializers import CocktailSearchItem
 from barbados.factories.spec import SpecFactory
+from barbados.search.cocktail import CocktailSearch
 
 
 def test_list_get(client):
@@ -10,6 +13,19 @@ def test_list_get(client):
     assert 220 < recipe_count < 300
 
 
+def test_list_get_page(client):
+    """Test that cocktails can be fetched a page and a few fields at a time"""
+    result = client.get('/api/v1/cocktails?limit=10&fields=slug,display_name')
+    data = json.loads(result.data)
+    assert len(data) == 10
+    assert all(set(c.keys()) == {'slug', 'display_name'} for c in data)
+    assert 'after=%s' % data[-1].get('slug') in result.headers.get('Link')
+
+    result = client.get('/api/v1/cocktails?limit=10&fields=slug&after=%s' % data[-1].get('slug'))
+    next_data = json.loads(result.data)
+    assert next_data[0].get('slug') > data[-1].get('slug')
+
+
 def test_single_get(client):
     """Test that a single cocktail was returned"""
     endpoint = '/api/v1/cocktails/martinez'
@@ -26,6 +42,82 @@ def test_search_get(client):
     assert result_count > 0
 
 
+def _search_specs(client, query):
+    result = client.get('/api/v1/cocktails/search?hierarchy=false&%s' % query)
+    return {(item.get('cocktail_slug'), item.get('spec_slug')) for item in json.loads(result.data)}
+
+
+def _backend_specs(**args):
+    results = marshal(CocktailSearch(**args).execute(), CocktailSearchItem)
+    return {(item.get('cocktail_slug'), item.get('spec_slug')) for item in results}
+
+
+def test_search_get_name_matches_backend(client):
+    """Test that a name search finds the same specs as the search backend"""
+    specs = _search_specs(client, 'name=martinez')
+    assert specs
+    assert specs == _backend_specs(name='martinez')
+
+
+def test_search_get_components_matches_backend(client):
+    """Test that a component search answered in-process finds the same specs as the search backend"""
+    specs = _search_specs(client, 'components=lime-juice')
+    assert specs
+    assert specs == _backend_specs(components=['lime-juice'])
+
+
+def test_search_get_combined_matches_backend(client):
+    """Test that several filters together find the same specs as the search backend"""
+    specs = _search_specs(client, 'components=lime-juice,simple-syrup&no_components=gin&construction=shaken')
+    assert specs
+    assert specs == _backend_specs(components=['lime-juice', 'simple-syrup'], no_components=['gin'], construction='shaken')
+
+
+def test_search_get_empty_matches_backend(client):
+    """Test that a search matching nothing is empty, as it is in the search backend"""
+    assert _search_specs(client, 'components=not-an-ingredient') == set()
+    assert _backend_specs(components=['not-an-ingredient']) == set()
+
+
+def test_search_get_hierarchy(client):
+    """Test that components match below themselves in the ingredient tree only when asked to"""
+    def search(query):
+        result = client.get('/api/v1/cocktails/search?%s' % query)
+        return {(item.get('cocktail_slug'), item.get('spec_slug')) for item in json.loads(result.data)}
+
+    exact = search('components=rum')
+    assert exact == search('components=rum&hierarchy=false')
+    assert exact < search('components=rum&hierarchy=true')
+
+
+def test_search_get_after_delete(client):
+    """Test that a deleted cocktail is gone from a search that was already made"""
+    cocktail = json.loads(client.get('/api/v1/cocktails/martinez').data)
+    cocktail.update(slug='martinez-deleted', display_name='Martinez Deleted')
+    result = client.post('/api/v1/cocktails', json=cocktail)
+    assert result.status_code == 201
+
+    endpoint = '/api/v1/cocktails/search?name=martinez deleted'
+    result = client.get(endpoint)
+    assert 'martinez-deleted' in [item.get('cocktail_slug') for item in json.loads(result.data)]
+
+    result = client.delete('/api/v1/cocktails/martinez-deleted')
+    assert result.status_code == 204
+
+    result = client.get(endpoint)
+    assert 'martinez-deleted' not in [item.get('cocktail_slug') for item in json.loads(result.data)]
+
+
+def test_bulk_post_atomic(client):
+    """Test that an atomic bulk import with a bad cocktail imports nothing"""
+    martinez = json.loads(client.get('/api/v1/cocktails/martinez').data)
+    result = client.post('/api/v1/cocktails/bulk?atomic=true', json=[martinez, {'slug': 'not-a-cocktail'}])
+    data = json.loads(result.data)
+    assert result.status_code == 400
+    assert data.get('imported') == []
+    assert [error.get('index') for error in data.get('errors')] == [1]
+
+
 def test_bibliography_get(client):
     """Test that the bibliography works"""
     result = client.get('/api/v1/cocktails/bibliography')
@@ -33,6 +125,41 @@ def test_bibliography_get(client):
     assert len(data) > 1
 
 
+def test_single_get_not_modified(client):
+    """Test that a repeated request with the ETag is not sent the body again"""
+    endpoint = '/api/v1/cocktails/martinez'
+    result = client.get(endpoint)
+    etag = result.headers.get('ETag')
+    assert etag
+
+    result = client.get(endpoint, headers={'If-None-Match': etag})
+    assert result.status_code == 304
+    assert not result.data
+
+
+def test_similar_get(client):
+    """Test that similar cocktails are other cocktails, best first"""
+    result = client.get('/api/v1/cocktails/old-fashioned/similar?ancestors=true&limit=5')
+    data = json.loads(result.data)
+    assert 0 < len(data) <= 5
+    assert 'old-fashioned' not in [item.get('cocktail_slug') for item in data]
+    scores = [item.get('score') for item in data]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_single_get_cached(client):
+    """Test that a cocktail is served the same from the object cache"""
+    endpoint = '/api/v1/cocktails/martinez'
+    first = client.get(endpoint)
+    second = client.get(endpoint)
+    assert json.loads(first.data) == json.loads(second.data)
+
+    result = client.get('/api/v1/caches/objects/stats')
+    stats = {cache.get('name'): cache for cache in json.loads(result.data)}
+    assert stats.get('cocktails').get('hits') > 0
+    assert stats.get('cocktails').get('bytes') <= stats.get('cocktails').get('max_bytes')
+
+
 ###
 # Old Fashioned
 ###
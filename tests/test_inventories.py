@@ -0,0 +1,83 @@
+import json
+from .client import client
+
+
+def test_recipes_preview(client):
+    """Test resolving an unsaved inventory"""
+    payload = {
+        'display_name': 'Preview',
+        'items': {
+            'el-dorado-12-year-rum': {'slug': 'el-dorado-12-year-rum'},
+            'lime-juice': {'slug': 'lime-juice'},
+        }
+    }
+    result = client.post('/api/v1/inventories/recipes/preview', json=payload)
+    data = json.loads(result.data)
+    assert result.status_code == 200
+    assert len(data) > 220
+    assert all(rs.get('status_count') is not None for rs in data)
+
+
+def test_summary_matches_resolver(client):
+    """Test that the matrix summary counts agree with the per-cocktail resolver across an implies_root"""
+    payload = {
+        'display_name': 'Implies Root',
+        'items': {
+            'el-dorado-12-year-rum': {'slug': 'el-dorado-12-year-rum'},
+            'lime-juice': {'slug': 'lime-juice'},
+            'simple-syrup': {'slug': 'simple-syrup'},
+        }
+    }
+    result = client.post('/api/v1/inventories', json=payload)
+    id = json.loads(result.data).get('id')
+
+    try:
+        result = client.get('/api/v1/inventories/%s/recipes/summary' % id)
+        summary = {rs.get('spec_slug'): rs.get('status_count') for rs in json.loads(result.data)
+                   if rs.get('cocktail_slug') == 'daiquiri'}
+
+        result = client.get('/api/v1/inventories/%s/recipes/daiquiri' % id)
+        resolved = {rs.get('spec_slug'): rs.get('status_count') for rs in json.loads(result.data)}
+
+        assert summary
+        assert summary == resolved
+    finally:
+        client.delete('/api/v1/inventories/%s' % id)
+
+
+def test_recipes_batch_no_body(client):
+    """Test that resolving many inventories without a body is a client error"""
+    result = client.post('/api/v1/inventories/recipes', data='null', content_type='application/json')
+    assert result.status_code == 400
+
+
+def test_recipes_spec_removed(client):
+    """Test that a spec removed from a cocktail is gone from the recipes of an inventory that was resolved before"""
+    result = client.post('/api/v1/inventories', json={'display_name': 'Removed Spec', 'items': {}})
+    id = json.loads(result.data).get('id')
+
+    cocktail = json.loads(client.get('/api/v1/cocktails/old-fashioned').data)
+    cocktail.update(slug='old-fashioned-removed-spec', display_name='Old Fashioned Removed Spec')
+    other = dict(cocktail, slug='old-fashioned-other', display_name='Old Fashioned Other')
+    endpoint = '/api/v1/inventories/%s/recipes' % id
+
+    def specs():
+        result = client.get(endpoint)
+        return {rs.get('spec_slug') for rs in json.loads(result.data)
+                if rs.get('cocktail_slug') == 'old-fashioned-removed-spec'}
+
+    try:
+        client.post('/api/v1/cocktails', json=cocktail)
+        assert len(specs()) == 2
+
+        cocktail['specs'] = cocktail.get('specs')[:1]
+        client.post('/api/v1/cocktails/bulk?overwrite=true', json=[cocktail])
+        assert specs() == {cocktail.get('specs')[0].get('slug')}
+
+        # Another write to the corpus, so that the stored results of this one are reused.
+        client.post('/api/v1/cocktails', json=other)
+        assert specs() == {cocktail.get('specs')[0].get('slug')}
+    finally:
+        client.delete('/api/v1/cocktails/old-fashioned-removed-spec')
+        client.delete('/api/v1/cocktails/old-fashioned-other')
+        client.delete('/api/v1/inventories/%s' % id)
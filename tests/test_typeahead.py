@@ -0,0 +1,17 @@
+import json
+from .client import client
+
+
+def test_prefix_get(client):
+    """Test that a name is completed from the start of any word"""
+    result = client.get('/api/v1/typeahead?q=dorado&kinds=ingredient')
+    data = json.loads(result.data)
+    assert 'el-dorado-12-year-rum' in [item.get('slug') for item in data]
+    assert all(item.get('distance') == 0 for item in data)
+
+
+def test_typo_get(client):
+    """Test that a small typo still finds the name"""
+    result = client.get('/api/v1/typeahead?q=daiqiri')
+    data = json.loads(result.data)
+    assert 'daiquiri' in [item.get('cocktail_slug') for item in data]